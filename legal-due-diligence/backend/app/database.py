@@ -1,14 +1,27 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, AsyncExitStack
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+import asyncio
+from functools import lru_cache
 from .config import settings
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    future=True
-)
+
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Get the process-wide async engine (created once, pooled connections)."""
+    return create_async_engine(
+        settings.DATABASE_URL,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+
+
+engine = get_engine()
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -22,10 +35,115 @@ AsyncSessionLocal = async_sessionmaker(
 # Create base class for models
 Base = declarative_base()
 
+# Seconds an agent scope keeps its connection after the last get_db(). The
+# tool calls of one agent step arrive together, while the LLM calls between
+# steps take longer, so the connection is held per burst of tool calls
+# rather than for the whole run
+AGENT_CONNECTION_IDLE_TIMEOUT = 1.0
+
+
+class _AgentDBScope:
+    """Session shared by the get_db() calls of one agent run."""
+
+    def __init__(self):
+        # Serializes use of the session across concurrently running tool calls
+        self.lock = asyncio.Lock()
+        self.session: Optional[AsyncSession] = None
+        self._connection: Optional[AsyncConnection] = None
+        self._release_task: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> AsyncSession:
+        """Get the session, checking out a connection if it has none. Call with lock held."""
+        if self._release_task is not None:
+            self._release_task.cancel()
+            self._release_task = None
+
+        if self.session is None:
+            self._connection = await engine.connect()
+            self.session = AsyncSessionLocal(bind=self._connection)
+        return self.session
+
+    def release_when_idle(self):
+        """Return the connection to the pool unless it is used again soon."""
+        self._release_task = asyncio.create_task(self._release_after_idle())
+
+    async def _release_after_idle(self):
+        await asyncio.sleep(AGENT_CONNECTION_IDLE_TIMEOUT)
+        async with self.lock:
+            await self.close()
+
+    async def close(self):
+        """Close the session and return its connection to the pool. Call with lock held."""
+        if self._release_task is not None and self._release_task is not asyncio.current_task():
+            self._release_task.cancel()
+        self._release_task = None
+
+        if self.session is not None:
+            await self.session.close()
+            await self._connection.close()
+            self.session = self._connection = None
+
+
+# The agent_db_scope() active in this context, if any
+_current_scope: ContextVar[Optional[_AgentDBScope]] = ContextVar(
+    "current_db_scope", default=None
+)
+
+# Whether this context is already inside a get_db() on the scope's session
+_holding_scope_session: ContextVar[bool] = ContextVar(
+    "holding_scope_session", default=False
+)
+
+
+@asynccontextmanager
+async def agent_db_scope():
+    """
+    Share one connection between the get_db() calls of an agent run.
+
+    The agent's tools each open get_db(), so without a scope every tool call
+    checks a connection out of the pool (and pre-pings it). Inside the scope
+    they reuse one session on one checked-out connection, which goes back to
+    the pool after AGENT_CONNECTION_IDLE_TIMEOUT seconds without use.
+    """
+    if _current_scope.get() is not None:
+        yield
+        return
+
+    scope = _AgentDBScope()
+    token = _current_scope.set(scope)
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+        async with scope.lock:
+            await scope.close()
+
 
 @asynccontextmanager
 async def get_db():
     """Async context manager for database sessions."""
+    scope = _current_scope.get()
+    if scope is not None:
+        if _holding_scope_session.get():
+            # Nested get_db(): the outer one owns the transaction
+            yield scope.session
+            return
+
+        # Inside an agent_db_scope(): reuse its session, one user at a time
+        async with scope.lock:
+            session = await scope.acquire()
+            token = _holding_scope_session.set(True)
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                _holding_scope_session.reset(token)
+                scope.release_when_idle()
+        return
+
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -33,11 +151,24 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
+
+
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency providing a request-scoped database session."""
+    async with get_db() as session:
+        yield session
 
 
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def warm_db_pool():
+    """Open pool_size connections up front so first requests skip the handshake."""
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*[
+            stack.enter_async_context(engine.connect())
+            for _ in range(settings.DB_POOL_SIZE)
+        ])
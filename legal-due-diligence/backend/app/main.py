@@ -9,42 +9,57 @@ FastAPI application providing:
 """
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import List, Dict, Any
-from uuid import uuid4
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Dict, Any, Tuple
 import logging
 import asyncio
 import os
+import tempfile
+import orjson
 
 from .config import settings
-from .database import init_db, get_db
-from .models import Session, Document, DocumentPage, SessionStatus
+from .database import init_db, warm_db_pool, get_db, get_db_session, agent_db_scope
+from .models import Session, Document, DocumentPage, SessionStatus, generate_short_id
 from .websocket.connection_manager import manager
-from .services.agent_service import LegalDueDiligenceAgent
-from .services.document_service import DocumentService
+from .services.agent_service import get_agent, release_agent
+from .services.document_service import (
+    DocumentService, DocumentTooLargeError, ProcessedDocument, close_anthropic_client
+)
+from .services.pdf_processor import shutdown_render_pool
+from .services import cache
+from .tools.data_room_tools import prewarm_documents_listing
 from .middleware.approval import ApprovalContextBuilder, APPROVAL_REQUIRED_TOOLS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Legal Due Diligence API")
+app = FastAPI(title="Legal Due Diligence API", default_response_class=ORJSONResponse)
+
+# Bytes read per chunk when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 # CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_origins=frozenset(settings.ALLOWED_ORIGINS),  # O(1) origin checks
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (document lists, page summaries)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
+    """Initialize database and warm its connection pool on startup."""
     await init_db()
+    await warm_db_pool()
     logger.info("Database initialized")
 
 
@@ -52,6 +67,9 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown."""
     await manager.disconnect_all()
+    await cache.close_redis()
+    await close_anthropic_client()
+    shutdown_render_pool()
 
 
 # ============================================================================
@@ -59,7 +77,10 @@ async def shutdown_event():
 # ============================================================================
 
 @app.post("/api/documents/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db_session)
+):
     """
     Upload a legal document to the data room.
 
@@ -78,23 +99,26 @@ async def upload_document(file: UploadFile = File(...)):
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-    # Save uploaded file temporarily
-    import tempfile
+    # Stream uploaded file to a temp file so memory stays flat for large PDFs
     with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-        content = await file.read()
-        temp_file.write(content)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await asyncio.to_thread(temp_file.write, chunk)
         temp_file_path = temp_file.name
 
     try:
         # Process document
         doc_service = DocumentService()
 
-        async with get_db() as db:
+        try:
             document = await doc_service.process_document(
                 file_path=temp_file_path,
                 filename=file.filename,
                 db_session=db
             )
+        except DocumentTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        await cache.invalidate_documents_list()
 
         # Return document info
         return {
@@ -102,49 +126,65 @@ async def upload_document(file: UploadFile = File(...)):
             "filename": document.filename,
             "summary": document.summary,
             "pages": document.page_count,
-            "uploaded_at": document.uploaded_at.isoformat()
+            "uploaded_at": document.uploaded_at
         }
 
     finally:
         # Clean up temp file
-        import os
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+        if await asyncio.to_thread(os.path.exists, temp_file_path):
+            await asyncio.to_thread(os.unlink, temp_file_path)
 
 
 @app.get("/api/documents")
-async def list_documents():
-    """List all documents in the data room."""
-    async with get_db() as db:
-        result = await db.execute(
-            select(Document).order_by(Document.uploaded_at.desc())
-        )
-        documents = result.scalars().all()
-
-    return {
+async def list_documents(db: AsyncSession = Depends(get_db_session)):
+    """List all documents in the data room (cached in Redis)."""
+    cache_key = await cache.documents_list_key()
+    cached = await cache.get_cached(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    result = await db.execute(
+        select(
+            Document.id,
+            Document.filename,
+            Document.summary,
+            Document.page_count,
+            Document.uploaded_at
+        ).order_by(Document.uploaded_at.desc())
+    )
+    documents = result.all()
+
+    response = {
         "documents": [
             {
                 "id": doc.id,
                 "filename": doc.filename,
                 "summary": doc.summary,
                 "pages": doc.page_count,
-                "uploaded_at": doc.uploaded_at.isoformat()
+                "uploaded_at": doc.uploaded_at
             }
             for doc in documents
         ]
     }
 
+    await cache.set_cached(
+        cache_key,
+        orjson.dumps(response),
+        settings.DOCUMENTS_LIST_CACHE_TTL
+    )
+
+    return response
+
 
 @app.get("/api/documents/{document_id}")
-async def get_document(document_id: str):
+async def get_document(document_id: str, db: AsyncSession = Depends(get_db_session)):
     """Get detailed information about a document."""
-    async with get_db() as db:
-        result = await db.execute(
-            select(Document)
-            .options(selectinload(Document.pages))
-            .where(Document.id == document_id)
-        )
-        doc = result.scalar_one_or_none()
+    result = await db.execute(
+        select(Document)
+        .options(joinedload(Document.pages))
+        .where(Document.id == document_id)
+    )
+    doc = result.unique().scalar_one_or_none()
 
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -160,7 +200,7 @@ async def get_document(document_id: str):
                 "summary": page.summary,
                 "legally_significant": page.legally_significant
             }
-            for page in sorted(doc.pages, key=lambda p: p.page_num)
+            for page in doc.pages
         ]
     }
 
@@ -172,6 +212,16 @@ async def get_document_pdf(document_id: str):
     raise HTTPException(status_code=501, detail="PDF retrieval not implemented")
 
 
+def _list_pdf_files(folder_path: str) -> List[str]:
+    """List paths of PDF files directly inside a folder."""
+    with os.scandir(folder_path) as entries:
+        return [
+            entry.path
+            for entry in entries
+            if entry.name.lower().endswith(".pdf") and entry.is_file()
+        ]
+
+
 @app.post("/api/documents/process-folder")
 async def process_folder(data: Dict[str, Any]):
     """
@@ -185,51 +235,103 @@ async def process_folder(data: Dict[str, Any]):
     """
     folder_path = data.get("folder_path")
 
-    if not folder_path or not os.path.exists(folder_path):
+    if not folder_path or not await asyncio.to_thread(os.path.exists, folder_path):
         raise HTTPException(status_code=400, detail="Invalid folder path")
 
     logger.info(f"Processing folder: {folder_path}")
 
     # Get all PDF files in folder
-    import glob
-    pdf_files = glob.glob(os.path.join(folder_path, "*.pdf"))
+    pdf_files = await asyncio.to_thread(_list_pdf_files, folder_path)
 
     if not pdf_files:
         return {"message": "No PDF files found in folder", "processed": []}
 
     logger.info(f"Found {len(pdf_files)} PDF files")
 
-    # Process each document
+    # Documents are processed concurrently (bounded so we don't flood Claude
+    # or the DB pool) without holding a DB transaction; finished documents
+    # are then stored DOCUMENT_COMMIT_BATCH_SIZE at a time, each batch in one
+    # short transaction
     doc_service = DocumentService()
-    processed_docs = []
+    semaphore = asyncio.Semaphore(settings.DOCUMENT_PROCESSING_CONCURRENCY)
+    batch_size = settings.DOCUMENT_COMMIT_BATCH_SIZE
+
+    def document_result(document: Document) -> Dict[str, Any]:
+        return {
+            "id": document.id,
+            "filename": document.filename,
+            "summary": document.summary,
+            "pages": document.page_count
+        }
 
-    for pdf_path in pdf_files:
+    async def compute_one(pdf_path: str):
         filename = os.path.basename(pdf_path)
-        logger.info(f"Processing: {filename}")
+
+        async with semaphore:
+            logger.info(f"Processing: {filename}")
+
+            try:
+                file_hash = await doc_service.calculate_file_hash(pdf_path)
+
+                async with get_db() as db:
+                    existing_doc = await doc_service.find_by_hash(file_hash, db)
+                if existing_doc:
+                    logger.info(f"Document already processed: {filename}")
+                    return filename, existing_doc
+
+                return filename, await doc_service.compute_document(pdf_path, filename, file_hash)
+
+            except Exception as e:
+                logger.error(f"Failed to process {filename}: {e}")
+                return filename, e
+
+    async def store_batch(batch: List[Tuple[str, ProcessedDocument]]) -> List[Dict[str, Any]]:
+        results = []
 
         try:
             async with get_db() as db:
-                document = await doc_service.process_document(
-                    file_path=pdf_path,
-                    filename=filename,
-                    db_session=db
-                )
+                for filename, processed in batch:
+                    try:
+                        # Savepoint per document so one failure (e.g. a duplicate
+                        # file stored meanwhile) doesn't roll back the batch
+                        async with db.begin_nested():
+                            document = await doc_service.persist_document(processed, db)
+                        results.append(document_result(document))
+
+                    except Exception as e:
+                        logger.error(f"Failed to store {filename}: {e}")
+                        results.append({"filename": filename, "error": str(e)})
 
-            processed_docs.append({
-                "id": document.id,
-                "filename": document.filename,
-                "summary": document.summary,
-                "pages": document.page_count
-            })
+        except Exception as e:
+            # The batch's commit failed, so none of its documents were stored
+            logger.error(f"Failed to commit batch of {len(batch)} documents: {e}")
+            return [{"filename": filename, "error": str(e)} for filename, _ in batch]
 
-            logger.info(f"Successfully processed: {filename}")
+        logger.info(f"Committed batch of {len(batch)} documents")
+        return results
 
-        except Exception as e:
-            logger.error(f"Failed to process {filename}: {e}")
-            processed_docs.append({
-                "filename": filename,
-                "error": str(e)
-            })
+    processed_docs = []
+    pending: List[Tuple[str, ProcessedDocument]] = []
+
+    for next_done in asyncio.as_completed([compute_one(pdf_path) for pdf_path in pdf_files]):
+        filename, outcome = await next_done
+
+        if isinstance(outcome, Exception):
+            processed_docs.append({"filename": filename, "error": str(outcome)})
+        elif isinstance(outcome, Document):
+            processed_docs.append(document_result(outcome))
+        else:
+            pending.append((filename, outcome))
+
+        if len(pending) >= batch_size:
+            processed_docs.extend(await store_batch(pending))
+            pending = []
+
+    if pending:
+        processed_docs.extend(await store_batch(pending))
+
+    if any("id" in doc for doc in processed_docs):
+        await cache.invalidate_documents_list()
 
     return {
         "message": f"Processed {len(processed_docs)} documents",
@@ -242,7 +344,7 @@ async def process_folder(data: Dict[str, Any]):
 # ============================================================================
 
 @app.post("/api/sessions/start")
-async def start_session(data: Dict[str, Any]):
+async def start_session(data: Dict[str, Any], db: AsyncSession = Depends(get_db_session)):
     """
     Start a new legal due diligence session.
 
@@ -253,18 +355,17 @@ async def start_session(data: Dict[str, Any]):
     project_name = data.get("project_name")
     document_ids = data.get("document_ids", [])
 
-    session_id = str(uuid4())[:8]
+    session_id = generate_short_id()
 
     # Create session in database
-    async with get_db() as db:
-        session = Session(
-            id=session_id,
-            project_name=project_name,
-            document_ids=document_ids,
-            status=SessionStatus.CREATED
-        )
-        db.add(session)
-        await db.commit()
+    session = Session(
+        id=session_id,
+        project_name=project_name,
+        document_ids=document_ids,
+        status=SessionStatus.CREATED
+    )
+    db.add(session)
+    await db.commit()
 
     logger.info(f"Created session: {session_id}")
 
@@ -276,13 +377,18 @@ async def start_session(data: Dict[str, Any]):
 
 
 @app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, db: AsyncSession = Depends(get_db_session)):
     """Get session details."""
-    async with get_db() as db:
-        result = await db.execute(
-            select(Session).where(Session.id == session_id)
-        )
-        session = result.scalar_one_or_none()
+    result = await db.execute(
+        select(
+            Session.id,
+            Session.project_name,
+            Session.status,
+            Session.document_ids,
+            Session.created_at
+        ).where(Session.id == session_id)
+    )
+    session = result.one_or_none()
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -292,7 +398,7 @@ async def get_session(session_id: str):
         "project_name": session.project_name,
         "status": session.status,
         "document_ids": session.document_ids,
-        "created_at": session.created_at.isoformat()
+        "created_at": session.created_at
     }
 
 
@@ -312,13 +418,18 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     - Workflow events
     """
     await manager.connect(session_id, websocket)
+    agent_task = None
+
+    # The agent's first tool call is almost always the data room listing;
+    # render it while the agent's first LLM request is in flight
+    prewarm_task = asyncio.create_task(prewarm_documents_listing())
 
     try:
         # Send initial status
         await manager.send_agent_status(session_id, "connected")
 
-        # Start agent in background
-        asyncio.create_task(run_agent(session_id))
+        # Start agent in background, tied to this connection's lifetime
+        agent_task = asyncio.create_task(run_agent(session_id))
 
         # Listen for approval decisions
         while True:
@@ -328,11 +439,21 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 await handle_approval_decision(session_id, data)
 
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
         logger.info(f"Client disconnected: {session_id}")
     except Exception as e:
         logger.error(f"WebSocket error for {session_id}: {e}")
-        manager.disconnect(session_id)
+    finally:
+        # Don't leave the agent or the prewarm running (and holding DB
+        # connections) for a dead client
+        tasks = [task for task in (agent_task, prewarm_task) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # A reconnect may have replaced this socket; leave the new one's state alone
+        current = manager.active_connections.get(session_id)
+        if current is None or current is websocket:
+            release_agent(session_id)
+            manager.disconnect(session_id)
 
 
 async def run_agent(session_id: str):
@@ -342,7 +463,7 @@ async def run_agent(session_id: str):
     This executes the agent and handles approval workflow.
     """
     try:
-        # Update session status
+        # Load session and its documents, then mark it running, in one DB session
         async with get_db() as db:
             result = await db.execute(
                 select(Session).where(Session.id == session_id)
@@ -353,53 +474,59 @@ async def run_agent(session_id: str):
                 logger.error(f"Session not found: {session_id}")
                 return
 
-            session.status = SessionStatus.RUNNING
-            await db.commit()
-
-        await manager.send_agent_status(session_id, "running", "Starting legal due diligence analysis")
-
-        # Build initial user message with document summaries
-        async with get_db() as db:
             result = await db.execute(
                 select(Document).where(Document.id.in_(session.document_ids))
             )
             documents = result.scalars().all()
 
-        user_message = "Please perform legal due diligence on the following documents:\n\n"
-        for doc in documents:
-            user_message += f"- {doc.filename}: {doc.summary}\n"
+            session.status = SessionStatus.RUNNING
+
+        await manager.send_agent_status(session_id, "running", "Starting legal due diligence analysis")
+
+        # Build initial user message with document summaries
+        user_message = "Please perform legal due diligence on the following documents:\n\n" + "".join(
+            f"- {doc.filename}: {doc.summary}\n" for doc in documents
+        )
 
-        # Create and execute agent
-        agent = LegalDueDiligenceAgent(session_id)
+        # Get (or create) the session's agent and execute it
+        agent = get_agent(session_id)
 
-        # Execute with approval workflow
+        # Execute with approval workflow, with every tool call sharing one DB connection
         # This is simplified - in production would integrate with LangGraph's interrupt system
-        result = await agent.execute(user_message)
+        async with agent_db_scope():
+            result = await agent.execute(user_message)
 
         # Mark as completed
         async with get_db() as db:
-            result_db = await db.execute(
-                select(Session).where(Session.id == session_id)
+            await db.execute(
+                update(Session)
+                .where(Session.id == session_id)
+                .values(status=SessionStatus.COMPLETED)
             )
-            session = result_db.scalar_one_or_none()
-            if session:
-                session.status = SessionStatus.COMPLETED
-                await db.commit()
 
         await manager.send_agent_status(session_id, "completed", "Due diligence completed")
 
+    except asyncio.CancelledError:
+        # The client went away; record that the run stopped before re-raising
+        logger.info(f"Agent execution cancelled for {session_id}")
+
+        async with get_db() as db:
+            await db.execute(
+                update(Session)
+                .where(Session.id == session_id)
+                .values(status=SessionStatus.PAUSED, error_message="Client disconnected")
+            )
+        raise
+
     except Exception as e:
         logger.error(f"Agent execution error for {session_id}: {e}")
 
         async with get_db() as db:
-            result = await db.execute(
-                select(Session).where(Session.id == session_id)
+            await db.execute(
+                update(Session)
+                .where(Session.id == session_id)
+                .values(status=SessionStatus.FAILED, error_message=str(e))
             )
-            session = result.scalar_one_or_none()
-            if session:
-                session.status = SessionStatus.FAILED
-                session.error_message = str(e)
-                await db.commit()
 
         await manager.send_agent_status(session_id, "failed", str(e))
 
@@ -438,4 +565,12 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single worker: WebSocket connections and running agents live in process memory
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets"
+    )
@@ -4,47 +4,91 @@ Approval Workflow Middleware
 This module handles human-in-the-loop approval for agent actions.
 It builds rich context from tool calls to provide visual feedback in the UI.
 """
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
-from uuid import uuid4
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from collections import deque
 from datetime import datetime
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from uuid import UUID
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by, array_agg
 import logging
+import msgspec
+import secrets
+import sys
 
 from ..models import Document, DocumentPage
 from ..database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Sentinel for messages without a content attribute
+_MISSING = object()
 
-@dataclass
-class DocumentHighlight:
+# Approval request IDs are drawn from a pool refilled with one urandom read
+_REQUEST_ID_BATCH = 64
+_request_ids: deque = deque()
+
+
+# Caps on page summaries sent per document highlight
+MAX_PAGE_SUMMARIES = 50
+PAGE_CONTEXT_WINDOW = 2  # pages either side of each requested page
+
+# Characters of file content shown in file write/edit approvals
+CONTENT_PREVIEW_LENGTH = 200
+
+
+def _next_request_id() -> str:
+    """Get a unique approval request ID, formatted as a UUID4 string."""
+    if not _request_ids:
+        pool = secrets.token_bytes(16 * _REQUEST_ID_BATCH)
+        _request_ids.extend(
+            str(UUID(bytes=pool[i:i + 16], version=4))
+            for i in range(0, len(pool), 16)
+        )
+    return _request_ids.popleft()
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as a naive ISO-8601 string."""
+    return datetime.utcnow().isoformat()
+
+
+class DocumentHighlight(msgspec.Struct):
     """Highlight information for a document."""
     doc_id: str
     reason: str
     legally_significant_pages: List[int]
     all_pages_summary: Dict[int, str]
+    summaries_truncated: bool = False  # True when all_pages_summary is a subset
 
 
-@dataclass
-class PageHighlight:
+class PageHighlight(msgspec.Struct):
     """Highlight information for specific pages."""
     doc_id: str
     page_nums: List[int]
     context: str
 
 
-@dataclass
-class FileHighlight:
+class FileHighlight(msgspec.Struct):
     """Highlight information for file operations."""
     file_path: str
     operation: str  # 'write' or 'edit'
     content_preview: str
 
 
-@dataclass
-class ApprovalContext:
+@dataclass(slots=True)
+class HistoryScan:
+    """Context extracted from recent conversation history."""
+    reasoning: str
+    reasons: Dict[str, str]  # doc_id -> sentence explaining the request
+    todos: List[str]
+
+    def reason_for(self, doc_id: str) -> str:
+        """Why the agent wants a document, with a generic fallback."""
+        return self.reasons.get(doc_id, "Document requested for review")
+
+
+class ApprovalContext(msgspec.Struct):
     """Complete context for an approval request."""
     request_id: str
     tool_name: str
@@ -57,42 +101,13 @@ class ApprovalContext:
     related_todos: List[str]
     timestamp: str
 
+    def to_json_bytes(self) -> bytes:
+        """Serialize straight to JSON bytes (same shape as to_dict)."""
+        return msgspec.json.encode(self)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        return {
-            "request_id": self.request_id,
-            "tool_name": self.tool_name,
-            "tool_args": self.tool_args,
-            "allowed_decisions": self.allowed_decisions,
-            "document_highlights": [
-                {
-                    "doc_id": dh.doc_id,
-                    "reason": dh.reason,
-                    "legally_significant_pages": dh.legally_significant_pages,
-                    "all_pages_summary": dh.all_pages_summary
-                }
-                for dh in self.document_highlights
-            ],
-            "page_highlights": [
-                {
-                    "doc_id": ph.doc_id,
-                    "page_nums": ph.page_nums,
-                    "context": ph.context
-                }
-                for ph in self.page_highlights
-            ],
-            "file_highlights": [
-                {
-                    "file_path": fh.file_path,
-                    "operation": fh.operation,
-                    "content_preview": fh.content_preview
-                }
-                for fh in self.file_highlights
-            ],
-            "agent_reasoning": self.agent_reasoning,
-            "related_todos": self.related_todos,
-            "timestamp": self.timestamp
-        }
+        return msgspec.to_builtins(self)
 
 
 class ApprovalContextBuilder:
@@ -103,6 +118,20 @@ class ApprovalContextBuilder:
     in the UI (highlighting documents, pages, files, etc.)
     """
 
+    # Tool name -> builder method name; unknown tools use _build_generic_context
+    _BUILDERS = {
+        "get_documents": "_build_get_documents_context",
+        "get_page_text": "_build_page_context",
+        "get_page_image": "_build_page_context",
+        "write_file": "_build_file_context",
+        "edit_file": "_build_file_context",
+        "web_search": "_build_web_context",
+        "web_fetch": "_build_web_context",
+        "analyze_documents": "_build_subagent_context",
+        "create_report": "_build_subagent_context",
+    }
+    _BUILDERS = {sys.intern(name): builder for name, builder in _BUILDERS.items()}
+
     def __init__(self, session_id: str):
         self.session_id = session_id
 
@@ -126,23 +155,13 @@ class ApprovalContextBuilder:
         logger.info(f"[{self.session_id}] Building approval context for: {tool_name}")
 
         # Route to appropriate builder based on tool
-        if tool_name == "get_documents":
-            return await self._build_get_documents_context(tool_args, conversation_history)
-        elif tool_name == "get_page_text":
-            return await self._build_get_page_text_context(tool_args, conversation_history)
-        elif tool_name == "get_page_image":
-            return await self._build_get_page_image_context(tool_args, conversation_history)
-        elif tool_name in ["write_file", "edit_file"]:
-            return await self._build_file_context(tool_name, tool_args, conversation_history)
-        elif tool_name in ["web_search", "web_fetch"]:
-            return await self._build_web_context(tool_name, tool_args, conversation_history)
-        elif tool_name in ["analyze_documents", "create_report"]:
-            return await self._build_subagent_context(tool_name, tool_args, conversation_history)
-        else:
-            return await self._build_generic_context(tool_name, tool_args, conversation_history)
+        tool_name = sys.intern(tool_name)
+        handler = getattr(self, self._BUILDERS.get(tool_name, "_build_generic_context"))
+        return await handler(tool_name, tool_args, conversation_history)
 
     async def _build_get_documents_context(
         self,
+        tool_name: str,
         tool_args: Dict[str, Any],
         conversation_history: List[Any]
     ) -> ApprovalContext:
@@ -150,101 +169,99 @@ class ApprovalContextBuilder:
 
         doc_ids = tool_args.get("doc_ids", [])
 
-        # Fetch document details
-        async with get_db() as db:
-            result = await db.execute(
-                select(Document)
-                .options(selectinload(Document.pages))
-                .where(Document.id.in_(doc_ids))
-            )
-            documents = result.scalars().all()
+        # Fetch page summaries for the requested documents
+        pages = await self._load_page_summaries(doc_ids)
+
+        history = self._scan_history(conversation_history, doc_ids)
 
         # Build document highlights
         document_highlights = []
-        for doc in documents:
-            significant_pages = [p.page_num for p in doc.pages if p.legally_significant]
-            page_summaries = {p.page_num: p.summary for p in doc.pages}
+        for doc_id, (significant_pages, page_summaries) in pages.items():
+            summaries = page_summaries
+            if len(page_summaries) > MAX_PAGE_SUMMARIES:
+                # Keep legally significant pages first, then the earliest others
+                keep = set(significant_pages[:MAX_PAGE_SUMMARIES])
+                for page_num in page_summaries:
+                    if len(keep) >= MAX_PAGE_SUMMARIES:
+                        break
+                    keep.add(page_num)
+                summaries = {n: page_summaries[n] for n in sorted(keep)}
 
             document_highlights.append(DocumentHighlight(
-                doc_id=doc.id,
-                reason=self._extract_reason(doc.id, conversation_history),
+                doc_id=doc_id,
+                reason=history.reason_for(doc_id),
                 legally_significant_pages=significant_pages,
-                all_pages_summary=page_summaries
+                all_pages_summary=summaries,
+                summaries_truncated=len(summaries) < len(page_summaries)
             ))
 
         return ApprovalContext(
-            request_id=str(uuid4()),
-            tool_name="get_documents",
+            request_id=_next_request_id(),
+            tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "edit", "reject"],
             document_highlights=document_highlights,
             page_highlights=[],
             file_highlights=[],
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
-    async def _build_get_page_text_context(
+    async def _build_page_context(
         self,
+        tool_name: str,
         tool_args: Dict[str, Any],
         conversation_history: List[Any]
     ) -> ApprovalContext:
-        """Build context for get_page_text approval."""
+        """Build context for get_page_text / get_page_image approval."""
 
         doc_id = tool_args.get("doc_id")
         page_nums = tool_args.get("page_nums", [])
 
-        # Fetch document
-        async with get_db() as db:
-            result = await db.execute(
-                select(Document)
-                .options(selectinload(Document.pages))
-                .where(Document.id == doc_id)
-            )
-            doc = result.scalar_one_or_none()
+        # Fetch page summaries for the document
+        pages = await self._load_page_summaries([doc_id])
+
+        # Only summaries around the requested pages
+        window = {
+            page_num + offset
+            for page_num in page_nums
+            for offset in range(-PAGE_CONTEXT_WINDOW, PAGE_CONTEXT_WINDOW + 1)
+        }
 
         document_highlights = []
-        if doc:
-            significant_pages = [p.page_num for p in doc.pages if p.legally_significant]
-            page_summaries = {p.page_num: p.summary for p in doc.pages}
+        for found_id, (significant_pages, page_summaries) in pages.items():
+            summaries = {n: summary for n, summary in page_summaries.items() if n in window}
 
             document_highlights.append(DocumentHighlight(
-                doc_id=doc.id,
+                doc_id=found_id,
                 reason="Pages requested for detailed review",
                 legally_significant_pages=significant_pages,
-                all_pages_summary=page_summaries
+                all_pages_summary=summaries,
+                summaries_truncated=len(summaries) < len(page_summaries)
             ))
 
+        history = self._scan_history(conversation_history)
+
         page_highlights = [PageHighlight(
             doc_id=doc_id,
             page_nums=page_nums,
-            context=self._extract_reasoning(conversation_history)
+            context=history.reasoning
         )]
 
         return ApprovalContext(
-            request_id=str(uuid4()),
-            tool_name="get_page_text",
+            request_id=_next_request_id(),
+            tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "edit", "reject"],
             document_highlights=document_highlights,
             page_highlights=page_highlights,
             file_highlights=[],
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
-    async def _build_get_page_image_context(
-        self,
-        tool_args: Dict[str, Any],
-        conversation_history: List[Any]
-    ) -> ApprovalContext:
-        """Build context for get_page_image approval."""
-
-        # Similar to get_page_text but with image-specific context
-        return await self._build_get_page_text_context(tool_args, conversation_history)
-
     async def _build_file_context(
         self,
         tool_name: str,
@@ -254,10 +271,19 @@ class ApprovalContextBuilder:
         """Build context for file write/edit approval."""
 
         file_path = tool_args.get("file_path", "")
-        content = tool_args.get("content", "") or tool_args.get("new_string", "")
+        # write_file sends "content", edit_file sends "new_string"; either may
+        # arrive as an explicit null
+        content = tool_args.get("content") or tool_args.get("new_string") or ""
+
+        # Preview content; only the head of large (or binary) content is touched
+        if isinstance(content, (bytes, bytearray)):
+            content_preview = bytes(content[:CONTENT_PREVIEW_LENGTH]).decode("utf-8", "replace")
+        else:
+            content_preview = str(content)[:CONTENT_PREVIEW_LENGTH]
+        if len(content) > CONTENT_PREVIEW_LENGTH:
+            content_preview += "..."
 
-        # Preview content (first 200 chars)
-        content_preview = content[:200] + "..." if len(content) > 200 else content
+        history = self._scan_history(conversation_history)
 
         file_highlights = [FileHighlight(
             file_path=file_path,
@@ -266,16 +292,16 @@ class ApprovalContextBuilder:
         )]
 
         return ApprovalContext(
-            request_id=str(uuid4()),
+            request_id=_next_request_id(),
             tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "edit", "reject"],
             document_highlights=[],
             page_highlights=[],
             file_highlights=file_highlights,
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
     async def _build_web_context(
@@ -286,17 +312,19 @@ class ApprovalContextBuilder:
     ) -> ApprovalContext:
         """Build context for web search/fetch approval."""
 
+        history = self._scan_history(conversation_history)
+
         return ApprovalContext(
-            request_id=str(uuid4()),
+            request_id=_next_request_id(),
             tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "edit", "reject"],
             document_highlights=[],
             page_highlights=[],
             file_highlights=[],
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
     async def _build_subagent_context(
@@ -307,17 +335,19 @@ class ApprovalContextBuilder:
     ) -> ApprovalContext:
         """Build context for subagent task approval."""
 
+        history = self._scan_history(conversation_history)
+
         return ApprovalContext(
-            request_id=str(uuid4()),
+            request_id=_next_request_id(),
             tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "edit", "reject"],
             document_highlights=[],
             page_highlights=[],
             file_highlights=[],
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
     async def _build_generic_context(
@@ -328,65 +358,158 @@ class ApprovalContextBuilder:
     ) -> ApprovalContext:
         """Build generic context for unknown tools."""
 
+        history = self._scan_history(conversation_history)
+
         return ApprovalContext(
-            request_id=str(uuid4()),
+            request_id=_next_request_id(),
             tool_name=tool_name,
             tool_args=tool_args,
             allowed_decisions=["approve", "reject"],
             document_highlights=[],
             page_highlights=[],
             file_highlights=[],
-            agent_reasoning=self._extract_reasoning(conversation_history),
-            related_todos=self._extract_todos(conversation_history),
-            timestamp=datetime.utcnow().isoformat()
+            agent_reasoning=history.reasoning,
+            related_todos=history.todos,
+            timestamp=_utc_timestamp()
         )
 
-    def _extract_reasoning(self, conversation_history: List[Any]) -> str:
-        """Extract agent's most recent reasoning from conversation."""
+    async def _load_page_summaries(
+        self,
+        doc_ids: List[str]
+    ) -> Dict[str, Tuple[List[int], Dict[int, str]]]:
+        """
+        Load page summaries and legally significant pages per document.
 
-        for msg in reversed(conversation_history[-5:]):
-            if hasattr(msg, 'content') and isinstance(msg.content, str):
-                if len(msg.content) > 50:  # Skip very short messages
-                    return msg.content[:500]
+        Postgres aggregates each document's pages into a JSON object of
+        summaries and an array of significant page numbers, so this is one
+        round-trip with one row per document and no ORM objects.
 
-        return "Continuing with analysis task"
+        Args:
+            doc_ids: Document IDs to load
 
-    def _extract_reason(self, doc_id: str, conversation_history: List[Any]) -> str:
-        """Extract why agent wants this specific document."""
+        Returns:
+            Mapping of each existing doc_id to
+            (legally_significant_page_nums, {page_num: summary})
+        """
+        # json (unlike jsonb) keeps keys in aggregation order, so the pages
+        # arrive already sorted by page number
+        page_summaries = func.json_object_agg(
+            DocumentPage.page_num,
+            aggregate_order_by(DocumentPage.summary, DocumentPage.page_num),
+            type_=JSON
+        ).filter(DocumentPage.page_num.isnot(None))
+        significant_pages = array_agg(
+            aggregate_order_by(DocumentPage.page_num, DocumentPage.page_num)
+        ).filter(DocumentPage.legally_significant.is_(True))
 
-        for msg in reversed(conversation_history[-10:]):
-            if hasattr(msg, 'content') and doc_id in str(msg.content):
-                content = str(msg.content)
-                sentences = content.split('.')
-                for sentence in sentences:
-                    if doc_id in sentence:
-                        return sentence.strip()[:200]
+        async with get_db() as db:
+            result = await db.execute(
+                select(
+                    Document.id,
+                    Document.significant_page_nums,
+                    page_summaries.label("page_summaries"),
+                    significant_pages.label("significant_pages")
+                )
+                .outerjoin(DocumentPage, DocumentPage.document_id == Document.id)
+                .where(Document.id.in_(doc_ids))
+                .group_by(Document.id)
+            )
+            rows = result.all()
 
-        return "Document requested for review"
+        # JSON object keys come back as strings. Documents ingested before
+        # significant_page_nums existed fall back to the per-page flags
+        return {
+            row.id: (
+                row.significant_page_nums
+                if row.significant_page_nums is not None
+                else row.significant_pages or [],
+                {
+                    int(page_num): summary
+                    for page_num, summary in (row.page_summaries or {}).items()
+                }
+            )
+            for row in rows
+        }
 
-    def _extract_todos(self, conversation_history: List[Any]) -> List[str]:
-        """Extract current in-progress todos from conversation."""
+    def _scan_history(
+        self,
+        conversation_history: List[Any],
+        doc_ids: Iterable[str] = ()
+    ) -> HistoryScan:
+        """
+        Extract reasoning, per-document reasons, and todos in one reverse pass.
 
-        todos = []
-        for msg in reversed(conversation_history[-20:]):
-            if hasattr(msg, 'tool_calls'):
+        Reasoning comes from the last 5 messages, document reasons from the
+        last 10, and in-progress todos from the last 20.
+        """
+        reasoning = None
+        reasons: Dict[str, str] = {}
+        todos = None
+        pending = set(doc_ids)
+
+        for age, msg in enumerate(reversed(conversation_history[-20:])):
+            content = getattr(msg, 'content', _MISSING)
+            is_text = isinstance(content, str)
+
+            # Most recent substantive message (skip very short ones)
+            if reasoning is None and age < 5 and is_text and len(content) > 50:
+                reasoning = content[:500]
+
+            # Why the agent wants each document; stringify non-text content
+            # (e.g. content blocks) only here, and only once per message
+            if pending and age < 10 and content is not _MISSING:
+                if not is_text:
+                    content = str(content)
+                for doc_id in [d for d in pending if d in content]:
+                    sentence = self._find_sentence(content, doc_id)
+                    if sentence is not None:
+                        reasons[doc_id] = sentence
+                        pending.discard(doc_id)
+
+            # Current in-progress todos from the latest write_todos call
+            if todos is None and hasattr(msg, 'tool_calls'):
                 for tool_call in msg.tool_calls:
                     if tool_call.get('name') == 'write_todos':
                         args = tool_call.get('args', {})
                         task_list = args.get('todos', [])
-                        todos = [
+                        in_progress = [
                             task.get('content', '')
                             for task in task_list
                             if task.get('status') == 'in_progress'
                         ]
-                        if todos:
-                            return todos[:3]  # Return up to 3 current tasks
+                        if in_progress:
+                            todos = in_progress[:3]  # Up to 3 current tasks
+                            break
+
+            reasoning_done = reasoning is not None or age >= 4
+            reasons_done = not pending or age >= 9
+            if reasoning_done and reasons_done and todos is not None:
+                break
+
+        return HistoryScan(
+            reasoning=reasoning or "Continuing with analysis task",
+            reasons=reasons,
+            todos=todos or []
+        )
+
+    @staticmethod
+    def _find_sentence(content: str, doc_id: str) -> Optional[str]:
+        """Find the first sentence in content that mentions doc_id."""
+        idx = content.find(doc_id)
+        if idx < 0:
+            return None
+
+        # Expand to the surrounding '.'-delimited sentence without splitting
+        start = content.rfind('.', 0, idx) + 1
+        end = content.find('.', idx + len(doc_id))
+        if end < 0:
+            end = len(content)
 
-        return []
+        return content[start:end].strip()[:200]
 
 
-# Tools that require approval
-APPROVAL_REQUIRED_TOOLS = {
+# Tools that require approval (interned so lookups with dynamic names are cheap)
+APPROVAL_REQUIRED_TOOLS = frozenset(map(sys.intern, {
     "get_documents",
     "get_page_text",
     "get_page_image",
@@ -396,4 +519,4 @@ APPROVAL_REQUIRED_TOOLS = {
     "web_fetch",
     "analyze_documents",
     "create_report"
-}
+}))
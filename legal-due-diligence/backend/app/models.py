@@ -1,10 +1,20 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Float, Index, text as sql_text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import secrets
 
 from .database import Base
 
+# Short public IDs: 4 random bytes as 8 hex chars (32 bits). Collisions are
+# unlikely at data-room scale and surface as a primary key IntegrityError.
+SHORT_ID_LENGTH = 8
+
+
+def generate_short_id() -> str:
+    """Generate a short random ID for sessions and documents."""
+    return secrets.token_hex(SHORT_ID_LENGTH // 2)
+
 
 class SessionStatus(str, enum.Enum):
     CREATED = "created"
@@ -18,11 +28,11 @@ class Session(Base):
     """Legal due diligence session."""
     __tablename__ = "sessions"
 
-    id = Column(String, primary_key=True)
+    id = Column(String(SHORT_ID_LENGTH), primary_key=True)
     project_name = Column(String, nullable=False)
     status = Column(String, default=SessionStatus.CREATED)
     document_ids = Column(JSON, default=list)
-    thread_id = Column(String, nullable=True)
+    thread_id = Column(String, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
@@ -33,17 +43,24 @@ class Document(Base):
     """Legal document in the data room."""
     __tablename__ = "documents"
 
-    id = Column(String, primary_key=True)
-    filename = Column(String, nullable=False)
+    id = Column(String(SHORT_ID_LENGTH), primary_key=True)
+    filename = Column(String, nullable=False, index=True)
     file_hash = Column(String, unique=True, index=True)
     file_path = Column(String, nullable=False)  # S3 path
     summary = Column(Text)
     page_count = Column(Integer, default=0)
+    # Sorted page numbers of legally significant pages, denormalized at ingest
+    significant_page_nums = Column(JSON, default=list)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
 
-    # Relationship to pages
-    pages = relationship("DocumentPage", back_populates="document", cascade="all, delete-orphan")
+    # Relationship to pages (ordered by page number in SQL)
+    pages = relationship(
+        "DocumentPage",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        order_by="DocumentPage.page_num"
+    )
 
 
 class DocumentPage(Base):
@@ -51,7 +68,7 @@ class DocumentPage(Base):
     __tablename__ = "document_pages"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    document_id = Column(String, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    document_id = Column(String(SHORT_ID_LENGTH), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     page_num = Column(Integer, nullable=False)
     text = Column(Text)
     summary = Column(Text)
@@ -62,11 +79,44 @@ class DocumentPage(Base):
     # Relationship to document
     document = relationship("Document", back_populates="pages")
 
-    class Config:
-        # Unique constraint on document_id + page_num
-        indexes = [
-            {"fields": ["document_id", "page_num"], "unique": True}
-        ]
+    __table_args__ = (
+        # One row per page; also serves ordered page loads for a document
+        Index("ix_pages_doc_page", "document_id", "page_num", unique=True),
+        # Small index covering only legally significant pages
+        Index(
+            "ix_pages_significant",
+            "document_id",
+            "page_num",
+            postgresql_where=sql_text("legally_significant")
+        ),
+    )
+
+
+class PendingDocumentStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    FAILED = "failed"
+
+
+class PendingDocument(Base):
+    """PDF queued for ingestion by a process_documents.py worker."""
+    __tablename__ = "pending_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    file_path = Column(String, nullable=False, unique=True)  # Local path to the PDF
+    status = Column(String, default=PendingDocumentStatus.PENDING, nullable=False)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Workers only ever scan for unclaimed rows
+        Index(
+            "ix_pending_documents_pending",
+            "id",
+            postgresql_where=sql_text("status = 'pending'")
+        ),
+    )
 
 
 class AgentFile(Base):
@@ -74,7 +124,7 @@ class AgentFile(Base):
     __tablename__ = "agent_files"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(String(SHORT_ID_LENGTH), ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
     file_path = Column(String, nullable=False)
     content = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
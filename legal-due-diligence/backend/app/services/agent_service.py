@@ -7,6 +7,7 @@ This module implements the deep agents architecture for legal due diligence:
 - Report Subagent: Creates final due diligence reports
 """
 from typing import List, Dict, Any, Optional
+from functools import lru_cache, cached_property
 from langchain_anthropic import ChatAnthropic
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -103,16 +104,22 @@ Create a clear, concise, and actionable report that a legal team can use to make
 """
 
 
+@lru_cache(maxsize=1)
+def get_llm() -> ChatAnthropic:
+    """Get the shared Claude chat model (reuses one HTTP connection pool)."""
+    return ChatAnthropic(
+        model="claude-3-5-sonnet-20241022",
+        api_key=settings.ANTHROPIC_API_KEY,
+        temperature=0
+    )
+
+
 class LegalDueDiligenceAgent:
     """Main legal due diligence agent."""
 
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            api_key=settings.ANTHROPIC_API_KEY,
-            temperature=0
-        )
+        self.llm = get_llm()
 
         # Create tools
         self.data_room_tools = create_data_room_tools(session_id)
@@ -124,6 +131,16 @@ class LegalDueDiligenceAgent:
         # All tools for main agent
         self.tools = self.data_room_tools + self.subagent_tools
 
+    @cached_property
+    def _analysis_subagent(self) -> "AnalysisSubagent":
+        """Analysis subagent, shared by every analyze_documents delegation."""
+        return AnalysisSubagent(self.session_id)
+
+    @cached_property
+    def _report_subagent(self) -> "CreateReportSubagent":
+        """Report subagent, created on first use."""
+        return CreateReportSubagent(self.session_id)
+
     def _create_subagent_tools(self) -> List:
         """Create subagent delegation tools."""
 
@@ -143,11 +160,7 @@ class LegalDueDiligenceAgent:
             """
             logger.info(f"[{self.session_id}] Delegating to Analysis subagent: {task_description}")
 
-            # Create analysis subagent
-            analysis_agent = AnalysisSubagent(self.session_id)
-
-            # Execute analysis
-            result = await analysis_agent.execute(task_description, document_ids)
+            result = await self._analysis_subagent.execute(task_description, document_ids)
 
             return result
 
@@ -167,46 +180,42 @@ class LegalDueDiligenceAgent:
             """
             logger.info(f"[{self.session_id}] Delegating to Create Report subagent")
 
-            # Create report subagent
-            report_agent = CreateReportSubagent(self.session_id)
-
-            # Generate report
-            result = await report_agent.execute(instructions)
+            result = await self._report_subagent.execute(instructions)
 
             return result
 
         return [analyze_documents, create_report]
 
-    async def execute(self, user_message: str) -> Dict[str, Any]:
-        """
-        Execute the main agent with the user's message.
-
-        Args:
-            user_message: Initial message with data room document summaries
-
-        Returns:
-            Final agent response
-        """
-        logger.info(f"[{self.session_id}] Starting legal due diligence agent")
-
-        # Create prompt
+    @cached_property
+    def _executor(self) -> AgentExecutor:
+        """Agent executor, built on first use and reused for the session."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", LEGAL_DUE_DILIGENCE_PROMPT),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
 
-        # Create agent
         agent = create_tool_calling_agent(self.llm, self.tools, prompt)
-        agent_executor = AgentExecutor(
+        return AgentExecutor(
             agent=agent,
             tools=self.tools,
             verbose=True,
             max_iterations=50
         )
 
-        # Execute
-        result = await agent_executor.ainvoke({"input": user_message})
+    async def execute(self, user_message: str) -> Dict[str, Any]:
+        """
+        Execute the main agent with the user's message.
+
+        Args:
+            user_message: Initial message with data room document summaries
+
+        Returns:
+            Final agent response
+        """
+        logger.info(f"[{self.session_id}] Starting legal due diligence agent")
+
+        result = await self._executor.ainvoke({"input": user_message})
 
         return result
 
@@ -216,11 +225,7 @@ class AnalysisSubagent:
 
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            api_key=settings.ANTHROPIC_API_KEY,
-            temperature=0
-        )
+        self.llm = get_llm()
 
         # Create tools
         self.data_room_tools = create_data_room_tools(session_id)
@@ -229,37 +234,37 @@ class AnalysisSubagent:
         # Combine tools
         self.tools = self.data_room_tools + self.web_tools
 
-    async def execute(self, task_description: str, document_ids: List[str]) -> str:
-        """
-        Execute analysis task.
-
-        Args:
-            task_description: What to analyze
-            document_ids: Documents to analyze
-
-        Returns:
-            Analysis findings
-        """
-        logger.info(f"[{self.session_id}] Analysis subagent executing: {task_description}")
-
-        # Create prompt
+    @cached_property
+    def _executor(self) -> AgentExecutor:
+        """Agent executor, built on first use and reused across tasks."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", LEGAL_ANALYSIS_PROMPT),
             ("human", "Analyze the following:\n\nTask: {task}\nDocuments: {documents}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
 
-        # Create agent
         agent = create_tool_calling_agent(self.llm, self.tools, prompt)
-        agent_executor = AgentExecutor(
+        return AgentExecutor(
             agent=agent,
             tools=self.tools,
             verbose=True,
             max_iterations=30
         )
 
-        # Execute
-        result = await agent_executor.ainvoke({
+    async def execute(self, task_description: str, document_ids: List[str]) -> str:
+        """
+        Execute analysis task.
+
+        Args:
+            task_description: What to analyze
+            document_ids: Documents to analyze
+
+        Returns:
+            Analysis findings
+        """
+        logger.info(f"[{self.session_id}] Analysis subagent executing: {task_description}")
+
+        result = await self._executor.ainvoke({
             "task": task_description,
             "documents": ", ".join(document_ids)
         })
@@ -272,44 +277,57 @@ class CreateReportSubagent:
 
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            api_key=settings.ANTHROPIC_API_KEY,
-            temperature=0
-        )
+        self.llm = get_llm()
 
         # Only file system tools for report generation
         self.tools = []  # File system tools will be added by the framework
 
-    async def execute(self, instructions: str) -> str:
-        """
-        Execute report creation.
-
-        Args:
-            instructions: Report generation instructions
-
-        Returns:
-            Path to created report
-        """
-        logger.info(f"[{self.session_id}] Create Report subagent executing")
-
-        # Create prompt
+    @cached_property
+    def _executor(self) -> AgentExecutor:
+        """Agent executor, built on first use."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", CREATE_REPORT_PROMPT),
             ("human", "{instructions}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
 
-        # Create agent
         agent = create_tool_calling_agent(self.llm, self.tools, prompt)
-        agent_executor = AgentExecutor(
+        return AgentExecutor(
             agent=agent,
             tools=self.tools,
             verbose=True,
             max_iterations=20
         )
 
-        # Execute
-        result = await agent_executor.ainvoke({"instructions": instructions})
+    async def execute(self, instructions: str) -> str:
+        """
+        Execute report creation.
+
+        Args:
+            instructions: Report generation instructions
+
+        Returns:
+            Path to created report
+        """
+        logger.info(f"[{self.session_id}] Create Report subagent executing")
+
+        result = await self._executor.ainvoke({"instructions": instructions})
 
         return result.get("output", "Report created at /report.md")
+
+
+# Live agents keyed by session ID, so a resumed approval flow reuses state
+_agents: Dict[str, LegalDueDiligenceAgent] = {}
+
+
+def get_agent(session_id: str) -> LegalDueDiligenceAgent:
+    """Get the agent for a session, creating it on first use."""
+    agent = _agents.get(session_id)
+    if agent is None:
+        agent = _agents[session_id] = LegalDueDiligenceAgent(session_id)
+    return agent
+
+
+def release_agent(session_id: str):
+    """Drop a session's agent once its connection is gone."""
+    _agents.pop(session_id, None)
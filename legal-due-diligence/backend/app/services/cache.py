@@ -0,0 +1,101 @@
+"""
+Redis Cache Client
+
+Read-through caching for hot API responses. Cache failures are logged and
+treated as misses so the API keeps serving from the database if Redis is down.
+"""
+from functools import lru_cache
+from typing import List, Optional
+import logging
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the set of documents changes; old list entries expire via TTL
+DOCUMENTS_LIST_VERSION_KEY = "documents:list:version"
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """Get the shared async Redis client (created once per process)."""
+    return redis.from_url(settings.REDIS_URL)
+
+
+async def close_redis():
+    """Close the shared Redis client's connection pool."""
+    if get_redis.cache_info().currsize:
+        await get_redis().close()
+        get_redis.cache_clear()
+
+
+async def get_cached(key: str) -> Optional[bytes]:
+    """
+    Get a cached value.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Cached bytes, or None on a miss or Redis error
+    """
+    try:
+        return await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Cache get failed for {key}: {e}")
+        return None
+
+
+async def get_cached_many(keys: List[str]) -> List[Optional[bytes]]:
+    """
+    Get several cached values in one round trip.
+
+    Args:
+        keys: Cache keys
+
+    Returns:
+        Cached bytes per key, None for misses; all None on a Redis error
+    """
+    if not keys:
+        return []
+    try:
+        return await get_redis().mget(keys)
+    except RedisError as e:
+        logger.warning(f"Cache get failed for {len(keys)} keys: {e}")
+        return [None] * len(keys)
+
+
+async def set_cached(key: str, value: bytes, ttl: int):
+    """
+    Store a value in the cache.
+
+    Args:
+        key: Cache key
+        value: Serialized value
+        ttl: Expiration time in seconds
+    """
+    try:
+        await get_redis().set(key, value, ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Cache set failed for {key}: {e}")
+
+
+async def documents_list_key() -> str:
+    """Get the cache key for the current version of the documents list."""
+    try:
+        version = await get_redis().get(DOCUMENTS_LIST_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"Cache version lookup failed: {e}")
+        version = None
+    return f"documents:list:v{int(version or 0)}"
+
+
+async def invalidate_documents_list():
+    """Invalidate cached documents lists after documents are added or removed."""
+    try:
+        await get_redis().incr(DOCUMENTS_LIST_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"Cache invalidation failed: {e}")
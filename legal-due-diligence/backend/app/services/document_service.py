@@ -8,117 +8,447 @@ Processes legal documents using Claude Haiku for analysis:
 4. Identify legally significant pages
 5. Store in database
 """
-from typing import List, Dict, Any, Tuple
-from anthropic import Anthropic
-from PIL import Image
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from dataclasses import dataclass
+from functools import lru_cache
+from anthropic import AsyncAnthropic
+from blake3 import blake3
+import asyncio
 import base64
-import io
+import mmap
 import os
-import hashlib
 import logging
-from uuid import uuid4
+import re
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from sqlalchemy.orm import selectinload
 
-from ..models import Document, DocumentPage
+from ..models import Document, DocumentPage, generate_short_id
 from ..config import settings
 from .pdf_processor import PDFProcessor
-from .storage_client import S3Client
+from .storage_client import get_s3_client
+from . import cache
 
 logger = logging.getLogger(__name__)
 
+# Read size for file hashing; large reads keep the hash core busy
+HASH_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Files at least this large are hashed through mmap instead of reads
+HASH_MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Rough characters per Claude token, used to bound prompt sizes locally
+CHARS_PER_TOKEN = 4
+
+# Page summaries per section when a document is analyzed map-reduce style
+ANALYSIS_SECTION_SIZE = 20
+
+# Splits an analysis response into its SUMMARY and SIGNIFICANT_PAGES parts
+ANALYSIS_RESPONSE_PATTERN = re.compile(
+    r"SUMMARY:\s*(.*?)\s*SIGNIFICANT_PAGES:\s*(.*)", re.DOTALL
+)
+
+# One item of the SIGNIFICANT_PAGES list: a page number or page range,
+# optionally introduced by "page(s)"
+PAGE_NUMBER_PATTERN = re.compile(
+    r"(?:pages?\s+)?(\d+)(?:\s*[-\u2013]\s*(\d+))?",
+    re.IGNORECASE
+)
+
+# Separators between items of the SIGNIFICANT_PAGES list
+PAGE_LIST_SEPARATOR_PATTERN = re.compile(r",|\band\b", re.IGNORECASE)
+
+
+def parse_significant_pages(pages_text: str, total_pages: int) -> List[int]:
+    """
+    Parse the page list that follows SIGNIFICANT_PAGES: in an analysis reply.
+
+    Only the first non-empty line is read, and only up to the first item
+    that isn't a page number or range, so any explanation the model adds
+    afterwards ("see Section 7.1 ... page 11") is not taken for pages.
+
+    Args:
+        pages_text: Reply text after the SIGNIFICANT_PAGES: header
+        total_pages: Total number of pages in the document
+
+    Returns:
+        Sorted page numbers, with ranges expanded and pages outside the
+        document dropped
+    """
+    line = next((line for line in pages_text.splitlines() if line.strip()), "")
+
+    pages = set()
+    for item in PAGE_LIST_SEPARATOR_PATTERN.split(line.strip().strip("[]")):
+        item = item.strip()
+        if not item:
+            continue  # "1, 3, and 5" leaves an empty item between "," and "and"
+        match = PAGE_NUMBER_PATTERN.fullmatch(item)
+        if not match:
+            break
+        first = int(match.group(1))
+        last = int(match.group(2)) if match.group(2) else first
+        pages.update(range(max(first, 1), min(last, total_pages) + 1))
+
+    return sorted(pages)
+
+
+# Output tokens budgeted for each page's summary in a batched request
+PAGE_SUMMARY_MAX_TOKENS = 500
+
+# Haiku's output ceiling; larger max_tokens values are rejected outright
+MODEL_MAX_OUTPUT_TOKENS = 4096
+
+# Encoded requests per Message Batches submission; the API caps a batch at
+# 256 MB, and the pending requests are held in memory until submitted
+BATCH_API_MAX_BYTES = 128 * 1024 * 1024
+
+# Splits a batched summary response into its "PAGE <n>:" sections
+PAGE_SUMMARY_PATTERN = re.compile(r"^PAGE (\d+):", re.MULTILINE)
+
+
+async def _cancel_tasks(tasks: List[asyncio.Task]):
+    """Cancel tasks left running by a failed caller and wait for them to finish."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class DocumentTooLargeError(Exception):
+    """Raised when a PDF has more than MAX_PAGES pages."""
+
+
+@lru_cache(maxsize=1)
+def get_anthropic_client() -> AsyncAnthropic:
+    """Get the shared Claude client (reuses one HTTP connection pool)."""
+    return AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+
+
+@lru_cache(maxsize=1)
+def get_claude_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore bounding in-flight Claude Haiku requests in this process."""
+    return asyncio.Semaphore(settings.CLAUDE_CONCURRENCY)
+
+
+async def close_anthropic_client():
+    """Close the shared Claude client, if it was created."""
+    if get_anthropic_client.cache_info().currsize:
+        await get_anthropic_client().close()
+        get_anthropic_client.cache_clear()
+
+
+@dataclass(slots=True)
+class ProcessedDocument:
+    """A processed document and its page rows, not yet stored in the database."""
+    document: Document
+    pages: List[Dict[str, Any]]
+
 
 class DocumentService:
     """Service for processing and analyzing legal documents."""
 
-    def __init__(self):
-        self.pdf_processor = PDFProcessor()
-        self.s3_client = S3Client()
-        self.anthropic = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+    def __init__(self, use_batch_api: bool = False):
+        """
+        Create the service.
 
-    def _image_to_base64(self, image: Image.Image) -> str:
-        """Convert PIL Image to base64 string."""
-        buffer = io.BytesIO()
-        image.save(buffer, format='PNG')
-        buffer.seek(0)
-        return base64.b64encode(buffer.read()).decode('utf-8')
+        Args:
+            use_batch_api: Summarize pages through the Message Batches API.
+                Results can take hours, so only offline ingestion (the
+                process_documents.py CLI) should enable this
+        """
+        self.use_batch_api = use_batch_api
+        self.pdf_processor = PDFProcessor()
+        self.s3_client = get_s3_client()
+        self.anthropic = get_anthropic_client()
+        # Bounds in-flight Claude calls across every service in this process
+        self.claude_semaphore = get_claude_semaphore()
+
+    def _image_to_base64(self, image_bytes: bytes) -> str:
+        """Convert encoded image bytes to a base64 string."""
+        return base64.b64encode(image_bytes).decode('utf-8')
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Estimate the Claude token count of text (about 4 characters per token)."""
+        return len(text) // CHARS_PER_TOKEN
+
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Cut text to roughly max_tokens, ending on a word boundary."""
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        head = text[:max_chars]
+        words = head.rsplit(None, 1)
+        return words[0] if len(words) > 1 else head
 
     def _calculate_file_hash(self, file_path: str) -> str:
-        """Calculate SHA256 hash of a file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-
-    async def summarize_page(
-        self,
-        page_image: Image.Image,
-        page_text: str,
-        page_num: int
-    ) -> str:
         """
-        Summarize a single page using Claude Haiku.
+        Calculate the BLAKE3 hash of a file, used as the dedup key.
+
+        Prefixed with "b3:" so it never collides with the SHA-256 digests
+        stored before the algorithm changed.
+        """
+        file_hash = blake3(max_threads=blake3.AUTO)
+        with open(file_path, "rb", buffering=0) as f:
+            if os.fstat(f.fileno()).st_size >= HASH_MMAP_THRESHOLD:
+                # Hash straight from the page cache without copying into Python
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    file_hash.update(mapped)
+            else:
+                buffer = bytearray(HASH_BUFFER_SIZE)
+                view = memoryview(buffer)
+                while n := f.readinto(buffer):
+                    file_hash.update(view[:n])
+        return f"b3:{file_hash.hexdigest()}"
+
+    async def calculate_file_hash(self, file_path: str) -> str:
+        """
+        Calculate a file's dedup hash in a worker thread.
+
+        Hashing reads (or page-faults in) the whole file, so it is kept off
+        the event loop.
 
         Args:
-            page_image: PIL Image of the page
-            page_text: Extracted text from the page
-            page_num: Page number
+            file_path: Path to the file
 
         Returns:
-            Summary of the page
+            "b3:"-prefixed BLAKE3 hex digest
         """
-        logger.info(f"Summarizing page {page_num} with Claude Haiku")
+        return await asyncio.to_thread(self._calculate_file_hash, file_path)
 
-        # Convert image to base64
-        image_base64 = self._image_to_base64(page_image)
+    def _page_batch_params(self, pages: List[Tuple[bytes, str, int]]) -> Dict[str, Any]:
+        """
+        Build the messages.create parameters for summarizing several pages.
 
-        # Call Claude Haiku with vision
-        try:
-            message = self.anthropic.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=500,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/png",
-                                    "data": image_base64,
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": f"""Analyze this legal document page (page {page_num}).
-
-Extracted text from the page:
-{page_text[:2000]}  # Limit text to avoid token limits
-
-Please provide a concise summary (2-3 sentences) covering:
-- Main topic or purpose of this page
+        Args:
+            pages: List of (page_jpeg, page_text, page_num) tuples
+
+        Returns:
+            Keyword arguments for messages.create
+        """
+        page_nums = [page_num for _, _, page_num in pages]
+
+        # Interleave each page's image with its extracted text
+        content = []
+        for page_jpeg, page_text, page_num in pages:
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": "image/jpeg",
+                    "data": self._image_to_base64(page_jpeg),
+                },
+            })
+            content.append({
+                "type": "text",
+                "text": (
+                    f"Extracted text from page {page_num}:\n"
+                    f"{self._truncate_to_tokens(page_text, settings.PAGE_TEXT_MAX_TOKENS)}"
+                ),
+            })
+
+        content.append({
+            "type": "text",
+            "text": f"""The images above are pages {", ".join(map(str, page_nums))} of a legal document, each followed by its extracted text.
+
+For each page, provide a concise summary (2-3 sentences) covering:
+- Main topic or purpose of the page
 - Key terms, obligations, or provisions
 - Any notable legal clauses or conditions
 
-Summary:"""
-                            }
-                        ],
-                    }
-                ],
-            )
+Output one section per page, in order, each starting on a new line as:
+PAGE <page number>: <summary>"""
+        })
+
+        return {
+            "model": "claude-3-haiku-20240307",
+            "max_tokens": min(PAGE_SUMMARY_MAX_TOKENS * len(pages), MODEL_MAX_OUTPUT_TOKENS),
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    def _split_page_summaries(self, response_text: str) -> Dict[int, str]:
+        """
+        Split a batched summary response into its "PAGE <n>:" sections.
+
+        Args:
+            response_text: Model output, or empty if the request failed
+
+        Returns:
+            Summaries keyed by page number
+        """
+        # re.split yields [preamble, num, summary, num, summary, ...]
+        parts = PAGE_SUMMARY_PATTERN.split(response_text)
+        return {
+            int(num): summary.strip()
+            for num, summary in zip(parts[1::2], parts[2::2])
+            if summary.strip()
+        }
+
+    def _collect_page_summaries(
+        self,
+        summaries: Dict[int, str],
+        pages: List[Tuple[str, int]]
+    ) -> List[str]:
+        """
+        Order summaries by page, falling back to text for missing pages.
+
+        Args:
+            summaries: Summaries keyed by page number
+            pages: (page_text, page_num) tuples for the requested pages
+
+        Returns:
+            Summaries in the same order as pages
+        """
+        results = []
+        for page_text, page_num in pages:
+            summary = summaries.get(page_num)
+            if not summary:
+                # Fallback to text-only summary for pages missing from the response
+                logger.warning(f"No summary returned for page {page_num}")
+                summary = f"Page {page_num}: {page_text[:200]}"
+            results.append(summary)
+
+        return results
+
+    def _page_summary_key(self, page_jpeg: bytes, page_text: str) -> str:
+        """Cache key for a page summary, derived from the page's content."""
+        content_hash = blake3(page_jpeg)
+        content_hash.update(page_text.encode())
+        return f"page_summary:{content_hash.hexdigest()}"
+
+    async def summarize_page_batch(
+        self,
+        pages: List[Tuple[bytes, str, int]]
+    ) -> List[str]:
+        """
+        Summarize several pages in a single Claude Haiku call.
+
+        Pages whose content was summarized before (boilerplate shared across
+        documents, re-ingested files) are served from the Redis cache and
+        left out of the request.
+
+        Args:
+            pages: List of (page_jpeg, page_text, page_num) tuples
+
+        Returns:
+            Summaries in the same order as pages
+        """
+        keys = [
+            self._page_summary_key(page_jpeg, page_text)
+            for page_jpeg, page_text, _ in pages
+        ]
+        cached = await cache.get_cached_many(keys)
+
+        summaries = {
+            page_num: value.decode()
+            for (_, _, page_num), value in zip(pages, cached)
+            if value is not None
+        }
+        misses = [
+            (page, key)
+            for page, key, value in zip(pages, keys, cached)
+            if value is None
+        ]
+
+        if misses:
+            page_nums = [page_num for (_, _, page_num), _ in misses]
+            logger.info(f"Summarizing pages {page_nums} with Claude Haiku")
+
+            try:
+                async with self.claude_semaphore:
+                    message = await self.anthropic.messages.create(
+                        **self._page_batch_params([page for page, _ in misses])
+                    )
+                fresh = self._split_page_summaries(message.content[0].text)
+
+                # Only real summaries are cached, never the text fallbacks
+                for (_, _, page_num), key in misses:
+                    if page_num in fresh:
+                        await cache.set_cached(
+                            key, fresh[page_num].encode(), settings.PAGE_SUMMARY_CACHE_TTL
+                        )
+                summaries.update(fresh)
+
+            except Exception as e:
+                logger.error(f"Failed to summarize pages {page_nums}: {e}")
 
-            summary = message.content[0].text.strip()
-            logger.info(f"Page {page_num} summarized: {summary[:100]}...")
+        return self._collect_page_summaries(
+            summaries, [(page_text, page_num) for _, page_text, page_num in pages]
+        )
+
+    async def summarize_pages_with_batch_api(
+        self,
+        page_groups: List[Tuple[Dict[str, Any], List[Tuple[str, int, str]]]]
+    ) -> Dict[int, str]:
+        """
+        Summarize page groups through the Message Batches API.
 
-            return summary
+        Submits every group as one batch and polls until it ends or
+        BATCH_API_TIMEOUT passes, in which case the batch is cancelled.
+        Results arrive minutes later instead of seconds, at roughly half
+        the cost. Summaries returned are written to the Redis cache.
 
+        Args:
+            page_groups: (params, pages) per group, where params comes from
+                _page_batch_params and pages are (page_text, page_num,
+                cache_key) tuples
+
+        Returns:
+            Summaries keyed by page number; pages that failed are missing
+        """
+        # Each group is keyed by its first page number
+        requests = [
+            {
+                "custom_id": f"page_{pages[0][1]}",
+                "params": params,
+            }
+            for params, pages in page_groups
+        ]
+        # Keep only what's needed to read the results, so the encoded page
+        # images can be freed once the batch is submitted
+        group_pages = {request["custom_id"]: pages for request, (_, pages) in zip(requests, page_groups)}
+        del page_groups
+
+        summaries: Dict[int, str] = {}
+        batch = None
+        try:
+            batch = await self.anthropic.beta.messages.batches.create(requests=requests)
+            logger.info(f"Submitted message batch {batch.id} with {len(requests)} requests")
+            del requests
+
+            deadline = asyncio.get_running_loop().time() + settings.BATCH_API_TIMEOUT
+            while batch.processing_status != "ended":
+                if asyncio.get_running_loop().time() >= deadline:
+                    logger.error(f"Message batch {batch.id} timed out; cancelling it")
+                    await self.anthropic.beta.messages.batches.cancel(batch.id)
+                    return summaries
+                await asyncio.sleep(settings.BATCH_API_POLL_INTERVAL)
+                batch = await self.anthropic.beta.messages.batches.retrieve(batch.id)
+
+            async for entry in await self.anthropic.beta.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.error(f"Batch request {entry.custom_id} {entry.result.type}")
+                    continue
+
+                fresh = self._split_page_summaries(entry.result.message.content[0].text)
+                for _, page_num, key in group_pages.get(entry.custom_id, []):
+                    if page_num in fresh:
+                        await cache.set_cached(
+                            key, fresh[page_num].encode(), settings.PAGE_SUMMARY_CACHE_TTL
+                        )
+                summaries.update(fresh)
+
+        except asyncio.CancelledError:
+            # Don't leave an abandoned batch running (and billed) server-side
+            if batch is not None and batch.processing_status != "ended":
+                logger.warning(f"Cancelling message batch {batch.id}")
+                try:
+                    await self.anthropic.beta.messages.batches.cancel(batch.id)
+                except Exception as e:
+                    logger.error(f"Failed to cancel message batch {batch.id}: {e}")
+            raise
         except Exception as e:
-            logger.error(f"Failed to summarize page {page_num}: {e}")
-            # Fallback to text-only summary
-            return f"Page {page_num}: {page_text[:200]}"
+            logger.error(f"Failed to summarize pages with batch API: {e}")
+
+        return summaries
 
     async def analyze_document(
         self,
@@ -128,6 +458,10 @@ Summary:"""
         """
         Analyze the entire document to get summary and legally significant pages.
 
+        When the combined page summaries exceed ANALYSIS_MAX_PROMPT_TOKENS,
+        sections of ANALYSIS_SECTION_SIZE pages are analyzed separately and
+        their summaries are then condensed into one document summary.
+
         Args:
             page_summaries: List of page summaries
             total_pages: Total number of pages
@@ -137,20 +471,117 @@ Summary:"""
         """
         logger.info(f"Analyzing document with {total_pages} pages using Claude Haiku")
 
-        # Combine all page summaries
+        numbered_summaries = list(enumerate(page_summaries, start=1))
+
+        if (
+            len(numbered_summaries) <= ANALYSIS_SECTION_SIZE
+            or self._estimate_tokens("\n\n".join(page_summaries)) <= settings.ANALYSIS_MAX_PROMPT_TOKENS
+        ):
+            return await self._analyze_pages(numbered_summaries, total_pages)
+
+        # Map: analyze each section of pages independently
+        sections = [
+            numbered_summaries[start:start + ANALYSIS_SECTION_SIZE]
+            for start in range(0, len(numbered_summaries), ANALYSIS_SECTION_SIZE)
+        ]
+        section_results = await asyncio.gather(*(
+            self._analyze_pages(section, total_pages) for section in sections
+        ))
+
+        significant_pages = sorted({
+            page_num
+            for _, section_pages in section_results
+            for page_num in section_pages
+        })
+
+        # Reduce: condense the section summaries into one document summary
+        section_summaries = [
+            (section[0][0], section[-1][0], section_summary)
+            for section, (section_summary, _) in zip(sections, section_results)
+        ]
+        summary = await self._combine_section_summaries(section_summaries, total_pages)
+
+        logger.info(f"Document analysis complete. Significant pages: {significant_pages}")
+
+        return summary, significant_pages
+
+    async def _combine_section_summaries(
+        self,
+        section_summaries: List[Tuple[int, int, str]],
+        total_pages: int
+    ) -> str:
+        """
+        Condense per-section summaries into a single document summary.
+
+        Args:
+            section_summaries: (first_page, last_page, summary) per section
+            total_pages: Total number of pages
+
+        Returns:
+            Document summary
+        """
+        combined_sections = "\n\n".join([
+            f"Pages {first_page}-{last_page}: {summary}"
+            for first_page, last_page, summary in section_summaries
+        ])
+
+        try:
+            async with self.claude_semaphore:
+                message = await self.anthropic.messages.create(
+                    model="claude-3-haiku-20240307",
+                    max_tokens=1000,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": f"""You are analyzing a legal document with {total_pages} pages. Below are summaries of consecutive sections of the document.
+
+Section Summaries:
+{combined_sections}
+
+Provide a high-level summary of the entire document (3-5 sentences) covering its purpose and key points.
+
+SUMMARY:"""
+                        }
+                    ],
+                )
+
+            return message.content[0].text.strip()
+
+        except Exception as e:
+            logger.error(f"Failed to combine section summaries: {e}")
+            return " ".join(summary for _, _, summary in section_summaries)
+
+    async def _analyze_pages(
+        self,
+        numbered_summaries: List[Tuple[int, str]],
+        total_pages: int
+    ) -> Tuple[str, List[int]]:
+        """
+        Summarize pages and pick the legally significant ones in one call.
+
+        Args:
+            numbered_summaries: (page_num, summary) tuples for all or part
+                of the document
+            total_pages: Total number of pages in the document
+
+        Returns:
+            Tuple of (summary, legally_significant_page_numbers)
+        """
+        # Combine the page summaries
         combined_summaries = "\n\n".join([
-            f"Page {i+1}: {summary}"
-            for i, summary in enumerate(page_summaries)
+            f"Page {page_num}: {summary}"
+            for page_num, summary in numbered_summaries
         ])
 
         try:
-            message = self.anthropic.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"""You are analyzing a legal document with {total_pages} pages. Below are summaries of each page.
+            async with self.claude_semaphore:
+                message = await self.anthropic.messages.create(
+                    model="claude-3-haiku-20240307",
+                    max_tokens=1000,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": f"""You are analyzing a legal document with {total_pages} pages. Below are summaries of its pages.
 
 Page Summaries:
 {combined_summaries}
@@ -180,9 +611,9 @@ SUMMARY:
 SIGNIFICANT_PAGES:
 [Comma-separated page numbers, e.g., 1,3,5,7]
 """
-                    }
-                ],
-            )
+                        }
+                    ],
+                )
 
             response_text = message.content[0].text.strip()
 
@@ -190,20 +621,10 @@ SIGNIFICANT_PAGES:
             summary = ""
             significant_pages = []
 
-            if "SUMMARY:" in response_text and "SIGNIFICANT_PAGES:" in response_text:
-                parts = response_text.split("SIGNIFICANT_PAGES:")
-                summary = parts[0].replace("SUMMARY:", "").strip()
-
-                pages_text = parts[1].strip()
-                if pages_text and pages_text != "None" and pages_text != "N/A":
-                    try:
-                        significant_pages = [
-                            int(p.strip())
-                            for p in pages_text.split(",")
-                            if p.strip().isdigit()
-                        ]
-                    except ValueError:
-                        logger.warning(f"Failed to parse significant pages: {pages_text}")
+            match = ANALYSIS_RESPONSE_PATTERN.search(response_text)
+            if match:
+                summary, pages_text = match.groups()
+                significant_pages = parse_significant_pages(pages_text, total_pages)
 
             logger.info(f"Document analysis complete. Significant pages: {significant_pages}")
 
@@ -214,97 +635,285 @@ SIGNIFICANT_PAGES:
             # Fallback
             return "Legal document (analysis failed)", []
 
-    async def process_document(
+    async def _iter_page_groups(
         self,
         file_path: str,
-        filename: str,
-        db_session
-    ) -> Document:
+        page_count: int
+    ) -> AsyncIterator[List[Tuple[bytes, str, int]]]:
         """
-        Process a PDF document completely.
+        Stream a PDF's pages in groups of PAGE_SUMMARY_BATCH_SIZE.
 
         Args:
             file_path: Path to the PDF file
-            filename: Original filename
-            db_session: Database session
+            page_count: Number of pages in the PDF
 
-        Returns:
-            Document model instance
+        Yields:
+            Lists of (page_jpeg, page_text, page_num) tuples
         """
-        logger.info(f"Processing document: {filename}")
-
-        # Calculate file hash
-        file_hash = self._calculate_file_hash(file_path)
-
-        # Check if already processed
-        result = await db_session.execute(
-            select(Document).where(Document.file_hash == file_hash)
-        )
-        existing_doc = result.scalar_one_or_none()
+        group = []
+        async for page_num, page_jpeg, page_text in self.pdf_processor.render_pages(file_path, page_count):
+            group.append((page_jpeg, page_text, page_num))
+            if len(group) == settings.PAGE_SUMMARY_BATCH_SIZE:
+                yield group
+                group = []
+        if group:
+            yield group
+
+    def _store_page_image(self, page_jpeg: bytes) -> str:
+        """
+        Upload a page image under its content hash, skipping existing objects.
 
-        if existing_doc:
-            logger.info(f"Document already processed: {filename}")
-            return existing_doc
+        Identical pages (cover sheets, boilerplate) share one S3 object.
 
-        # Generate document ID
-        doc_id = str(uuid4())[:8]
+        Args:
+            page_jpeg: JPEG-encoded page image
 
-        # Step 1: Extract pages as images and text
-        logger.info("Step 1: Extracting pages as images and text")
-        page_images, page_texts = self.pdf_processor.process_pdf(file_path)
+        Returns:
+            S3 path of the image
+        """
+        image_s3_path = f"pages/b3/{blake3(page_jpeg).hexdigest()}.jpg"
+        if not self.s3_client.file_exists(image_s3_path):
+            self.s3_client.upload_bytes(page_jpeg, image_s3_path, 'image/jpeg')
+        return image_s3_path
 
-        if len(page_images) != len(page_texts):
-            logger.warning(
-                f"Page count mismatch: {len(page_images)} images vs {len(page_texts)} texts. "
-                f"Using minimum count."
-            )
+    def _store_pdf(self, file_path: str, pdf_s3_path: str):
+        """Upload the original PDF unless an identical one is already stored."""
+        if not self.s3_client.file_exists(pdf_s3_path):
+            self.s3_client.upload_file(file_path, pdf_s3_path)
 
-        num_pages = min(len(page_images), len(page_texts))
+    async def _upload_page_images(self, group: List[Tuple[bytes, str, int]]) -> List[str]:
+        """
+        Upload a group's page images to S3 in worker threads.
 
-        # Step 2: Upload original PDF to S3
-        logger.info("Step 2: Uploading PDF to S3")
-        pdf_s3_path = f"documents/{doc_id}/{filename}"
-        self.s3_client.upload_file(file_path, pdf_s3_path)
+        Args:
+            group: List of (page_jpeg, page_text, page_num) tuples
 
-        # Step 3: Process each page
-        logger.info(f"Step 3: Processing {num_pages} pages with Claude Haiku")
-        page_summaries = []
-        pages_data = []
+        Returns:
+            S3 paths in page order
+        """
+        return await asyncio.gather(*(
+            asyncio.to_thread(self._store_page_image, page_jpeg)
+            for page_jpeg, _, _ in group
+        ))
 
-        for i in range(num_pages):
-            page_num = i + 1
-            page_image = page_images[i]
-            page_text = page_texts[i]
+    async def _process_page_group(
+        self,
+        group: List[Tuple[bytes, str, int]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Summarize a group of pages and upload their images.
 
-            # Summarize page with Claude Haiku
-            page_summary = await self.summarize_page(page_image, page_text, page_num)
-            page_summaries.append(page_summary)
+        Args:
+            group: List of (page_jpeg, page_text, page_num) tuples
 
-            # Upload page image to S3
-            image_s3_path = f"documents/{doc_id}/pages/page_{page_num}.png"
-            self.s3_client.upload_image(page_image, image_s3_path)
+        Returns:
+            Page data dicts in page order
+        """
+        # The S3 uploads are independent of the summaries, so overlap them
+        page_summaries, image_s3_paths = await asyncio.gather(
+            self.summarize_page_batch(group),
+            self._upload_page_images(group)
+        )
 
-            # Store page data
+        pages_data = []
+        for (_, page_text, page_num), page_summary, image_s3_path in zip(
+            group, page_summaries, image_s3_paths
+        ):
             pages_data.append({
                 'page_num': page_num,
                 'text': page_text,
                 'summary': page_summary,
                 'image_path': image_s3_path
             })
+            logger.info(f"Processed page {page_num}")
+
+        return pages_data
 
-            logger.info(f"Processed page {page_num}/{num_pages}")
+    async def _process_pages(self, file_path: str, page_count: int) -> List[Dict[str, Any]]:
+        """
+        Stream, summarize and upload every page of a PDF.
+
+        Groups are rendered as earlier ones are summarized, with at most
+        CLAUDE_CONCURRENCY groups in flight, so only those groups' images
+        are ever in memory.
+
+        Args:
+            file_path: Path to the PDF file
+            page_count: Number of pages in the PDF
+
+        Returns:
+            Page data dicts in page order
+        """
+        tasks = []
+        pending = set()
+
+        try:
+            async for group in self._iter_page_groups(file_path, page_count):
+                if len(pending) >= settings.CLAUDE_CONCURRENCY:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    # Surface a failed group now rather than after rendering the rest
+                    for task in done:
+                        task.result()
+
+                task = asyncio.create_task(self._process_page_group(group))
+                tasks.append(task)
+                pending.add(task)
+
+            groups_data = await asyncio.gather(*tasks)
+        except BaseException:
+            await _cancel_tasks(tasks)
+            raise
+
+        return [page_data for group_data in groups_data for page_data in group_data]
+
+    async def _process_pages_with_batch_api(self, file_path: str, page_count: int) -> List[Dict[str, Any]]:
+        """
+        Stream and upload every page of a PDF, summarizing them via batches.
+
+        Pages with a cached summary are left out of the batches. Each group's
+        request embeds base64 copies of its page images (about 4/3 of the
+        JPEG size), so requests are submitted as a new batch whenever
+        BATCH_API_MAX_BYTES of them accumulate; this keeps both memory and
+        each batch's size bounded.
+
+        Args:
+            file_path: Path to the PDF file
+            page_count: Number of pages in the PDF
+
+        Returns:
+            Page data dicts in page order
+        """
+        summaries: Dict[int, str] = {}
+        page_groups = []
+        page_groups_bytes = 0
+        batch_tasks = []
+        pages_data = []
+
+        try:
+            async for group in self._iter_page_groups(file_path, page_count):
+                keys = [
+                    self._page_summary_key(page_jpeg, page_text)
+                    for page_jpeg, page_text, _ in group
+                ]
+                cached = await cache.get_cached_many(keys)
+
+                misses = []
+                for page, key, value in zip(group, keys, cached):
+                    if value is None:
+                        misses.append((page, key))
+                    else:
+                        summaries[page[2]] = value.decode()
+
+                if misses:
+                    page_groups.append((
+                        self._page_batch_params([page for page, _ in misses]),
+                        [(page_text, page_num, key) for (_, page_text, page_num), key in misses]
+                    ))
+                    page_groups_bytes += sum(
+                        len(page_jpeg) * 4 // 3 + len(page_text)
+                        for (page_jpeg, page_text, _), _ in misses
+                    )
+
+                if page_groups_bytes >= BATCH_API_MAX_BYTES:
+                    batch_tasks.append(asyncio.create_task(
+                        self.summarize_pages_with_batch_api(page_groups)
+                    ))
+                    page_groups, page_groups_bytes = [], 0
+
+                image_s3_paths = await self._upload_page_images(group)
+                for (_, page_text, page_num), image_s3_path in zip(group, image_s3_paths):
+                    pages_data.append({
+                        'page_num': page_num,
+                        'text': page_text,
+                        'image_path': image_s3_path
+                    })
+
+            if page_groups:
+                batch_tasks.append(asyncio.create_task(
+                    self.summarize_pages_with_batch_api(page_groups)
+                ))
+                del page_groups
+
+            for batch_summaries in await asyncio.gather(*batch_tasks):
+                summaries.update(batch_summaries)
+        except BaseException:
+            await _cancel_tasks(batch_tasks)
+            raise
+
+        page_summaries = self._collect_page_summaries(
+            summaries, [(page_data['text'], page_data['page_num']) for page_data in pages_data]
+        )
+        for page_data, page_summary in zip(pages_data, page_summaries):
+            page_data['summary'] = page_summary
+
+        return pages_data
+
+    async def find_by_hash(self, file_hash: str, db_session) -> Optional[Document]:
+        """Get the already processed document with this file hash, if any."""
+        result = await db_session.execute(
+            select(Document).where(Document.file_hash == file_hash)
+        )
+        return result.scalar_one_or_none()
 
-        # Step 4: Analyze entire document
-        logger.info("Step 4: Analyzing entire document with Claude Haiku")
+    async def compute_document(
+        self,
+        file_path: str,
+        filename: str,
+        file_hash: str
+    ) -> ProcessedDocument:
+        """
+        Run the expensive part of processing, without touching the database.
+
+        Renders, uploads and summarizes every page and analyzes the whole
+        document, so callers can do this concurrently and keep their DB
+        transactions short.
+
+        Args:
+            file_path: Path to the PDF file
+            filename: Original filename
+            file_hash: The file's hash from calculate_file_hash
+
+        Returns:
+            The unsaved document and its page rows
+
+        Raises:
+            DocumentTooLargeError: If the document has more than MAX_PAGES pages
+        """
+        # Reject oversized documents before any rendering or uploads
+        page_count = await asyncio.to_thread(self.pdf_processor.get_page_count, file_path)
+        if page_count > settings.MAX_PAGES:
+            raise DocumentTooLargeError(
+                f"Document has {page_count} pages; the limit is {settings.MAX_PAGES}"
+            )
+
+        # Generate document ID
+        doc_id = generate_short_id()
+
+        # Step 1: Upload original PDF to S3, in a worker thread alongside
+        # Step 2: stream pages through Claude Haiku, uploading each page image
+        # while it is summarized
+        logger.info("Steps 1-2: Uploading PDF to S3 and processing pages with Claude Haiku")
+        pdf_s3_path = f"documents/b3/{file_hash.removeprefix('b3:')}.pdf"
+        if self.use_batch_api:
+            process_pages = self._process_pages_with_batch_api(file_path, page_count)
+        else:
+            process_pages = self._process_pages(file_path, page_count)
+
+        _, pages_data = await asyncio.gather(
+            asyncio.to_thread(self._store_pdf, file_path, pdf_s3_path),
+            process_pages
+        )
+
+        num_pages = len(pages_data)
+        page_summaries = [page_data['summary'] for page_data in pages_data]
+
+        # Step 3: Analyze entire document
+        logger.info("Step 3: Analyzing entire document with Claude Haiku")
         doc_summary, significant_pages = await self.analyze_document(
             page_summaries,
             num_pages
         )
 
-        # Step 5: Create database records
-        logger.info("Step 5: Storing in database")
-
-        # Create document record
         document = Document(
             id=doc_id,
             filename=filename,
@@ -312,27 +921,86 @@ SIGNIFICANT_PAGES:
             file_path=pdf_s3_path,
             summary=doc_summary,
             page_count=num_pages,
+            significant_page_nums=significant_pages,
             uploaded_at=datetime.utcnow(),
             processed_at=datetime.utcnow()
         )
 
-        db_session.add(document)
-
-        # Create page records
-        for page_data in pages_data:
-            page = DocumentPage(
-                document_id=doc_id,
-                page_num=page_data['page_num'],
-                text=page_data['text'],
-                summary=page_data['summary'],
-                image_path=page_data['image_path'],
-                legally_significant=page_data['page_num'] in significant_pages
-            )
-            db_session.add(page)
+        significant = set(significant_pages)
+        pages = [
+            {
+                'document_id': doc_id,
+                'page_num': page_data['page_num'],
+                'text': page_data['text'],
+                'summary': page_data['summary'],
+                'image_path': page_data['image_path'],
+                'legally_significant': page_data['page_num'] in significant
+            }
+            for page_data in pages_data
+        ]
+
+        return ProcessedDocument(document=document, pages=pages)
+
+    async def persist_document(self, processed: ProcessedDocument, db_session) -> Document:
+        """
+        Add a computed document and its pages to the session, without committing.
+
+        Args:
+            processed: Result of compute_document
+            db_session: Database session
+
+        Returns:
+            Document model instance
+        """
+        logger.info("Step 4: Storing in database")
+
+        db_session.add(processed.document)
+        # The document row must exist before the pages that reference it
+        await db_session.flush()
+
+        # Create page records in one executemany INSERT instead of one per page
+        if processed.pages:
+            await db_session.execute(insert(DocumentPage), processed.pages)
+
+        return processed.document
 
+    async def process_document(
+        self,
+        file_path: str,
+        filename: str,
+        db_session
+    ) -> Document:
+        """
+        Process a PDF document completely.
+
+        Args:
+            file_path: Path to the PDF file
+            filename: Original filename
+            db_session: Database session
+
+        Returns:
+            Document model instance
+
+        Raises:
+            DocumentTooLargeError: If the document has more than MAX_PAGES pages
+        """
+        logger.info(f"Processing document: {filename}")
+
+        # Calculate file hash
+        file_hash = await self.calculate_file_hash(file_path)
+
+        # Check if already processed
+        existing_doc = await self.find_by_hash(file_hash, db_session)
+
+        if existing_doc:
+            logger.info(f"Document already processed: {filename}")
+            return existing_doc
+
+        processed = await self.compute_document(file_path, filename, file_hash)
+        document = await self.persist_document(processed, db_session)
         await db_session.commit()
 
-        logger.info(f"Document processing complete: {doc_id}")
+        logger.info(f"Document processing complete: {document.id}")
 
         return document
 
@@ -370,12 +1038,26 @@ SIGNIFICANT_PAGES:
 
         if document:
             # Delete from S3
+            # Page images are content-addressed, so keep any that another
+            # document's pages still reference
+            shared_paths = select(DocumentPage.image_path).where(
+                DocumentPage.document_id != doc_id,
+                DocumentPage.image_path.isnot(None)
+            )
+            result = await db_session.execute(
+                select(DocumentPage.image_path).distinct().where(
+                    DocumentPage.document_id == doc_id,
+                    DocumentPage.image_path.isnot(None),
+                    DocumentPage.image_path.not_in(shared_paths)
+                )
+            )
+            image_paths = result.scalars().all()
+
             try:
-                self.s3_client.delete_file(document.file_path)
-                # Delete page images
-                for page in document.pages:
-                    if page.image_path:
-                        self.s3_client.delete_file(page.image_path)
+                # Delete the PDF and page images in batched requests
+                await asyncio.to_thread(
+                    self.s3_client.delete_many, [document.file_path, *image_paths]
+                )
             except Exception as e:
                 logger.warning(f"Failed to delete S3 files: {e}")
 
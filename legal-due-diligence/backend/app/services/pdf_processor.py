@@ -3,81 +3,104 @@ PDF Processing Utilities
 
 Handles PDF to image conversion and text extraction.
 """
-from typing import List, Tuple
-from pdf2image import convert_from_path
+from typing import AsyncIterator, List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from PIL import Image
-import PyPDF2
+import fitz  # PyMuPDF
+import asyncio
 import io
 import logging
-import tempfile
+import multiprocessing
 import os
 
 logger = logging.getLogger(__name__)
 
+# Readable for viewing while staying above Claude's ~1568px vision resize
+RENDER_DPI = 150
 
-class PDFProcessor:
-    """Process PDF files to extract images and text."""
+# JPEG quality for page images sent to Claude and stored in S3
+JPEG_QUALITY = 85
 
-    def __init__(self):
-        pass
+# Consecutive pages rendered per pool task; the PDF is opened (and its xref
+# parsed) once per task instead of once per page
+RENDER_PAGES_PER_TASK = 4
 
-    def extract_pages_as_images(self, pdf_path: str) -> List[Image.Image]:
-        """
-        Extract all pages from a PDF as images.
+# Tasks submitted ahead of the consumer, per worker process
+RENDER_LOOKAHEAD_PER_WORKER = 2
 
-        Args:
-            pdf_path: Path to the PDF file
 
-        Returns:
-            List of PIL Images, one per page
-        """
-        try:
-            logger.info(f"Extracting images from PDF: {pdf_path}")
+def _render_page_jpegs(pdf_path: str, start: int, stop: int) -> List[Tuple[bytes, str]]:
+    """
+    Render a run of PDF pages to JPEG bytes and extract their text.
 
-            # Convert PDF to images (one per page)
-            images = convert_from_path(
-                pdf_path,
-                dpi=200,  # Good quality for OCR and viewing
-                fmt='png'
-            )
+    Runs in a render pool worker process, so it only takes picklable
+    arguments and returns encoded bytes rather than PIL Images. The PDF is
+    closed before returning, so workers never hold a file open between
+    tasks (e.g. a deleted upload's disk space).
 
-            logger.info(f"Extracted {len(images)} pages as images")
-            return images
+    Args:
+        pdf_path: Path to the PDF file
+        start: First 0-indexed page to render
+        stop: Index one past the last page to render
 
-        except Exception as e:
-            logger.error(f"Failed to extract images from PDF: {e}")
-            raise
+    Returns:
+        (page_jpeg, page_text) per page, in page order
+    """
+    rendered = []
+    with fitz.open(pdf_path) as doc:
+        for page_index in range(start, stop):
+            page = doc[page_index]
+            pix = page.get_pixmap(dpi=RENDER_DPI)
+            page_text = page.get_text()
 
-    def extract_text_from_pdf(self, pdf_path: str) -> List[str]:
-        """
-        Extract text from all pages of a PDF.
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+            rendered.append((buffer.getvalue(), page_text))
 
-        Args:
-            pdf_path: Path to the PDF file
+    return rendered
 
-        Returns:
-            List of text strings, one per page
-        """
-        try:
-            logger.info(f"Extracting text from PDF: {pdf_path}")
 
-            page_texts = []
+# Render pool size; one worker per core unless configured otherwise
+_render_workers = os.cpu_count() or 1
 
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
 
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    page_texts.append(text)
+def configure_render_pool(max_workers: int):
+    """
+    Set the render pool size, restarting the pool if it is already running.
 
-            logger.info(f"Extracted text from {len(page_texts)} pages")
-            return page_texts
+    Processes that share the machine with sibling ingest workers use this
+    to split the cores between them instead of each taking all of them.
+    """
+    global _render_workers
+    shutdown_render_pool()
+    _render_workers = max(1, max_workers)
 
-        except Exception as e:
-            logger.error(f"Failed to extract text from PDF: {e}")
-            raise
+
+@lru_cache(maxsize=1)
+def get_render_pool() -> ProcessPoolExecutor:
+    """Get the shared page rendering pool."""
+    # Spawn rather than fork: the server process has running threads
+    return ProcessPoolExecutor(
+        max_workers=_render_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def shutdown_render_pool():
+    """Stop the render pool's worker processes, if it was started."""
+    if get_render_pool.cache_info().currsize:
+        get_render_pool().shutdown(cancel_futures=True)
+        get_render_pool.cache_clear()
+
+
+class PDFProcessor:
+    """Process PDF files to extract images and text."""
+
+    def __init__(self):
+        pass
 
     def get_page_count(self, pdf_path: str) -> int:
         """
@@ -90,34 +113,49 @@ class PDFProcessor:
             Number of pages
         """
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                return len(pdf_reader.pages)
+            with fitz.open(pdf_path) as doc:
+                return doc.page_count
         except Exception as e:
             logger.error(f"Failed to get page count: {e}")
             raise
 
-    def process_pdf(self, pdf_path: str) -> Tuple[List[Image.Image], List[str]]:
+    async def render_pages(
+        self,
+        pdf_path: str,
+        page_count: int
+    ) -> AsyncIterator[Tuple[int, bytes, str]]:
         """
-        Process a PDF to extract both images and text for all pages.
+        Render a PDF's pages across the render pool, in page order.
+
+        Rasterization and JPEG encoding are CPU-bound, so pages render in
+        parallel on every core. Only a bounded window of pages is submitted
+        ahead of the consumer, keeping memory independent of page count.
 
         Args:
             pdf_path: Path to the PDF file
+            page_count: Number of pages in the PDF
 
-        Returns:
-            Tuple of (page_images, page_texts)
+        Yields:
+            Tuples of (page_num, page_jpeg, page_text), 1-indexed
         """
-        logger.info(f"Processing PDF: {pdf_path}")
-
-        # Extract images and text in parallel would be ideal,
-        # but for simplicity we'll do it sequentially
-        page_images = self.extract_pages_as_images(pdf_path)
-        page_texts = self.extract_text_from_pdf(pdf_path)
-
-        # Verify counts match
-        if len(page_images) != len(page_texts):
-            logger.warning(
-                f"Page count mismatch: {len(page_images)} images vs {len(page_texts)} text pages"
-            )
-
-        return page_images, page_texts
+        logger.info(f"Rendering {page_count} pages from PDF: {pdf_path}")
+
+        loop = asyncio.get_running_loop()
+        pool = get_render_pool()
+        lookahead = _render_workers * RENDER_LOOKAHEAD_PER_WORKER
+
+        futures = deque()
+        next_index = 0
+        page_num = 0
+
+        while page_num < page_count:
+            while next_index < page_count and len(futures) < lookahead:
+                stop = min(next_index + RENDER_PAGES_PER_TASK, page_count)
+                futures.append(
+                    loop.run_in_executor(pool, _render_page_jpegs, pdf_path, next_index, stop)
+                )
+                next_index = stop
+
+            for page_jpeg, page_text in await futures.popleft():
+                page_num += 1
+                yield page_num, page_jpeg, page_text
@@ -6,15 +6,37 @@ Handles uploading and retrieving files from object storage.
 import boto3
 from botocore.exceptions import ClientError
 from botocore.client import Config
+from boto3.s3.transfer import TransferConfig
 import io
-from typing import Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
 import logging
-from PIL import Image
+import threading
+import time
 
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Large PDFs upload as 16 MiB parts sent in parallel
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# S3 accepts at most 1000 keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+# Object names remembered as existing, so repeat dedup checks skip the HEAD
+EXISTS_CACHE_SIZE = 100_000
+
+# Seconds an existence result is trusted; another process may delete the
+# object, so entries must expire rather than live until evicted
+EXISTS_CACHE_TTL = 60
+
 
 class S3Client:
     """Client for S3/MinIO object storage."""
@@ -31,6 +53,24 @@ class S3Client:
         self.bucket = settings.S3_BUCKET
         self._ensure_bucket_exists()
 
+        # LRU of object names known to exist, with the monotonic time each
+        # was last confirmed; uploads run in worker threads
+        self._known_objects: OrderedDict[str, float] = OrderedDict()
+        self._known_objects_lock = threading.Lock()
+
+    def _remember_object(self, object_name: str):
+        """Record that an object exists, evicting the least recently seen."""
+        with self._known_objects_lock:
+            self._known_objects[object_name] = time.monotonic()
+            self._known_objects.move_to_end(object_name)
+            if len(self._known_objects) > EXISTS_CACHE_SIZE:
+                self._known_objects.popitem(last=False)
+
+    def _forget_object(self, object_name: str):
+        """Drop an object from the existence cache."""
+        with self._known_objects_lock:
+            self._known_objects.pop(object_name, None)
+
     def _ensure_bucket_exists(self):
         """Create bucket if it doesn't exist."""
         try:
@@ -56,46 +96,14 @@ class S3Client:
             S3 path (object_name)
         """
         try:
-            self.client.upload_file(file_path, self.bucket, object_name)
+            self.client.upload_file(file_path, self.bucket, object_name, Config=TRANSFER_CONFIG)
+            self._remember_object(object_name)
             logger.info(f"Uploaded {file_path} to s3://{self.bucket}/{object_name}")
             return object_name
         except ClientError as e:
             logger.error(f"Failed to upload file: {e}")
             raise
 
-    def upload_image(self, image: Image.Image, object_name: str, format: str = 'PNG') -> str:
-        """
-        Upload a PIL Image to S3.
-
-        Args:
-            image: PIL Image object
-            object_name: S3 object name
-            format: Image format (PNG, JPEG, etc.)
-
-        Returns:
-            S3 path (object_name)
-        """
-        try:
-            # Convert image to bytes
-            buffer = io.BytesIO()
-            image.save(buffer, format=format)
-            buffer.seek(0)
-
-            # Upload
-            self.client.upload_fileobj(
-                buffer,
-                self.bucket,
-                object_name,
-                ExtraArgs={'ContentType': f'image/{format.lower()}'}
-            )
-
-            logger.info(f"Uploaded image to s3://{self.bucket}/{object_name}")
-            return object_name
-
-        except ClientError as e:
-            logger.error(f"Failed to upload image: {e}")
-            raise
-
     def upload_bytes(self, data: bytes, object_name: str, content_type: str = 'application/octet-stream') -> str:
         """
         Upload bytes data to S3.
@@ -109,13 +117,24 @@ class S3Client:
             S3 path (object_name)
         """
         try:
-            buffer = io.BytesIO(data)
-            self.client.upload_fileobj(
-                buffer,
-                self.bucket,
-                object_name,
-                ExtraArgs={'ContentType': content_type}
-            )
+            if len(data) < TRANSFER_CONFIG.multipart_threshold:
+                # Single PUT straight from the bytes, skipping the transfer
+                # manager's threads and chunk copies
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=object_name,
+                    Body=data,
+                    ContentType=content_type
+                )
+            else:
+                self.client.upload_fileobj(
+                    io.BytesIO(data),
+                    self.bucket,
+                    object_name,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=TRANSFER_CONFIG
+                )
+            self._remember_object(object_name)
 
             logger.info(f"Uploaded bytes to s3://{self.bucket}/{object_name}")
             return object_name
@@ -162,18 +181,33 @@ class S3Client:
         """
         Check if a file exists in S3.
 
+        Objects confirmed within the last EXISTS_CACHE_TTL seconds are
+        answered from the LRU cache; older entries and misses issue a HEAD
+        request. Negative results are not cached since the object may be
+        uploaded later.
+
         Args:
             object_name: S3 object name
 
         Returns:
             True if exists, False otherwise
         """
+        with self._known_objects_lock:
+            confirmed_at = self._known_objects.get(object_name)
+            if confirmed_at is not None:
+                if time.monotonic() - confirmed_at < EXISTS_CACHE_TTL:
+                    self._known_objects.move_to_end(object_name)
+                    return True
+                del self._known_objects[object_name]
+
         try:
             self.client.head_object(Bucket=self.bucket, Key=object_name)
-            return True
         except ClientError:
             return False
 
+        self._remember_object(object_name)
+        return True
+
     def delete_file(self, object_name: str):
         """
         Delete a file from S3.
@@ -182,12 +216,43 @@ class S3Client:
             object_name: S3 object name
         """
         try:
+            self._forget_object(object_name)
             self.client.delete_object(Bucket=self.bucket, Key=object_name)
             logger.info(f"Deleted s3://{self.bucket}/{object_name}")
         except ClientError as e:
             logger.error(f"Failed to delete file: {e}")
             raise
 
+    def delete_many(self, object_names: List[str]):
+        """
+        Delete several files from S3, up to 1000 per request.
+
+        Args:
+            object_names: S3 object names
+        """
+        for start in range(0, len(object_names), DELETE_BATCH_SIZE):
+            chunk = object_names[start:start + DELETE_BATCH_SIZE]
+            for object_name in chunk:
+                self._forget_object(object_name)
+
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        'Objects': [{'Key': object_name} for object_name in chunk],
+                        'Quiet': True
+                    }
+                )
+            except ClientError as e:
+                logger.error(f"Failed to delete files: {e}")
+                raise
+
+            # Quiet mode only reports the keys that failed
+            errors = response.get('Errors', [])
+            for error in errors:
+                logger.error(f"Failed to delete s3://{self.bucket}/{error['Key']}: {error['Message']}")
+            logger.info(f"Deleted {len(chunk) - len(errors)} objects from s3://{self.bucket}")
+
     def get_presigned_url(self, object_name: str, expiration: int = 3600) -> str:
         """
         Generate a presigned URL for an object.
@@ -209,3 +274,9 @@ class S3Client:
         except ClientError as e:
             logger.error(f"Failed to generate presigned URL: {e}")
             raise
+
+
+@lru_cache(maxsize=1)
+def get_s3_client() -> S3Client:
+    """Get the shared S3 client (bucket checked once per process)."""
+    return S3Client()
@@ -3,10 +3,12 @@ Data Room Tools for Legal Due Diligence Agent
 
 These tools allow the agent to interact with documents in the data room.
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
 from langchain.tools import tool
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, or_, tuple_
 import logging
 
 from ..models import Document, DocumentPage
@@ -14,6 +16,115 @@ from ..database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Rendered get_documents outputs kept per session
+DOCUMENTS_OUTPUT_CACHE_SIZE = 32
+
+# Rendered list_data_room_documents output, keyed by its freshness token
+# (latest upload time, document count); shared by every session's tools
+_documents_listing: Optional[Tuple[Tuple[Any, int], str]] = None
+
+
+async def get_documents_listing() -> str:
+    """
+    Render the data room listing shown by list_data_room_documents.
+
+    The rendered string is memoized behind a cheap freshness probe and
+    only rebuilt when documents have been added or removed.
+
+    Returns:
+        Listing of every document's ID, summary and page count
+    """
+    global _documents_listing
+
+    async with get_db() as db:
+        result = await db.execute(
+            select(func.max(Document.uploaded_at), func.count(Document.id))
+        )
+        token = tuple(result.one())
+
+        if _documents_listing is not None and _documents_listing[0] == token:
+            return _documents_listing[1]
+
+        result = await db.execute(
+            select(Document.id, Document.summary, Document.page_count)
+            .order_by(Document.uploaded_at.desc())
+        )
+        documents = result.all()
+
+    if not documents:
+        return "No documents found in the data room."
+
+    # Collect fields and separators into one list and join once, rather
+    # than building an intermediate string per document
+    parts = []
+    for doc in documents:
+        parts.extend((
+            "Document ID: ", doc.id,
+            "\nSummary: ", str(doc.summary),
+            "\nPages: ", str(doc.page_count),
+            "\n\n---\n\n"
+        ))
+
+    # Drop the trailing separator
+    listing = "".join(parts[:-1])
+    _documents_listing = (token, listing)
+    return listing
+
+
+async def prewarm_documents_listing():
+    """Render the data room listing ahead of the agent's first tool call."""
+    try:
+        await get_documents_listing()
+    except Exception as e:
+        logger.warning(f"Failed to prewarm data room listing: {e}")
+
+
+def _render_document(
+    parts: List[str],
+    doc: Any,
+    page_summaries: List[Tuple[str, int, str]],
+    significant_texts: List[Tuple[str, int, str]]
+):
+    """
+    Append one document's get_documents section to parts.
+
+    Pieces go straight into the caller's list so the whole output is joined
+    once, rather than building intermediate strings per page and document.
+
+    Args:
+        parts: Output pieces to append to
+        doc: Document row with id, filename and summary
+        page_summaries: (document_id, page_num, summary) for every page
+        significant_texts: (document_id, page_num, text) for legally significant pages
+    """
+    parts.extend((
+        "DOCUMENT: ", doc.filename, " (ID: ", doc.id, ")\n",
+        "Overall Summary: ", str(doc.summary), "\n\n",
+        "ALL PAGES:\n"
+    ))
+
+    # All pages with summaries
+    separator = ""
+    for _, page_num, summary in page_summaries:
+        parts.extend((separator, "Page ", str(page_num), ": ", str(summary)))
+        separator = "\n"
+
+    parts.append("\n\nLEGALLY SIGNIFICANT PAGES (FULL TEXT):\n")
+
+    # Full text of legally significant pages
+    if not significant_texts:
+        parts.append("No legally significant pages.")
+        return
+
+    separator = ""
+    for _, page_num, text in significant_texts:
+        parts.extend((
+            separator,
+            "=== Page ", str(page_num), " (Legally Significant) ===\n",
+            str(text)
+        ))
+        separator = "\n\n"
+
 
 def create_data_room_tools(session_id: str):
     """
@@ -25,6 +136,9 @@ def create_data_room_tools(session_id: str):
     - get_page_text: Get full text of specific pages
     - get_page_image: Get images of specific pages
     """
+    # Rendered get_documents output by sorted doc IDs, with the freshness
+    # token ((id, processed_at) per found document) it was rendered from
+    documents_outputs: OrderedDict[Tuple[str, ...], Tuple[Tuple, str]] = OrderedDict()
 
     @tool
     async def list_data_room_documents() -> str:
@@ -40,25 +154,7 @@ def create_data_room_tools(session_id: str):
         Use this first to understand what documents are available.
         """
         logger.info(f"[{session_id}] Listing data room documents")
-
-        async with get_db() as db:
-            result = await db.execute(
-                select(Document).order_by(Document.uploaded_at.desc())
-            )
-            documents = result.scalars().all()
-
-        if not documents:
-            return "No documents found in the data room."
-
-        output = []
-        for doc in documents:
-            output.append(
-                f"Document ID: {doc.id}\n"
-                f"Summary: {doc.summary}\n"
-                f"Pages: {doc.page_count}"
-            )
-
-        return "\n\n---\n\n".join(output)
+        return await get_documents_listing()
 
     @tool
     async def get_documents(doc_ids: List[str]) -> str:
@@ -77,46 +173,95 @@ def create_data_room_tools(session_id: str):
         """
         logger.info(f"[{session_id}] Getting documents: {doc_ids}")
 
+        cache_key = tuple(sorted(set(doc_ids)))
+
         async with get_db() as db:
             result = await db.execute(
-                select(Document)
-                .options(selectinload(Document.pages))
+                select(
+                    Document.id,
+                    Document.filename,
+                    Document.summary,
+                    Document.significant_page_nums,
+                    Document.processed_at
+                )
                 .where(Document.id.in_(doc_ids))
+                .order_by(Document.id)
             )
-            documents = result.scalars().all()
+            documents = result.all()
 
-        if not documents:
-            return f"Error: No documents found with IDs: {doc_ids}"
+            if not documents:
+                return f"Error: No documents found with IDs: {doc_ids}"
 
-        output = []
-        for doc in documents:
-            # All pages with summaries
-            pages_info = []
-            for page in sorted(doc.pages, key=lambda p: p.page_num):
-                pages_info.append(f"Page {page.page_num}: {page.summary}")
-
-            pages_summary = "\n".join(pages_info)
-
-            # Full text of legally significant pages
-            significant_pages = [p for p in doc.pages if p.legally_significant]
-            significant_text = []
-
-            for page in sorted(significant_pages, key=lambda p: p.page_num):
-                significant_text.append(
-                    f"=== Page {page.page_num} (Legally Significant) ===\n"
-                    f"{page.text}"
-                )
+            # Documents are immutable once processed, so an unchanged set of
+            # (id, processed_at) means the pages haven't changed either
+            token = tuple((doc.id, doc.processed_at) for doc in documents)
+            cached = documents_outputs.get(cache_key)
+            if cached is not None and cached[0] == token:
+                documents_outputs.move_to_end(cache_key)
+                return cached[1]
 
-            significant_section = "\n\n".join(significant_text) if significant_text else "No legally significant pages."
+            # Summaries of every page, without loading page text
+            result = await db.execute(
+                select(DocumentPage.document_id, DocumentPage.page_num, DocumentPage.summary)
+                .where(DocumentPage.document_id.in_(doc_ids))
+                .order_by(DocumentPage.document_id, DocumentPage.page_num)
+            )
+            page_summaries = {
+                doc_id: list(rows)
+                for doc_id, rows in groupby(result.all(), key=itemgetter(0))
+            }
+
+            # Full text only for legally significant pages, fetched by their
+            # stored page numbers; documents ingested before those were stored
+            # fall back to the per-page legally_significant flag
+            significant_keys = [
+                (doc.id, page_num)
+                for doc in documents
+                for page_num in doc.significant_page_nums or []
+            ]
+            legacy_ids = [doc.id for doc in documents if doc.significant_page_nums is None]
+
+            conditions = []
+            if significant_keys:
+                conditions.append(
+                    tuple_(DocumentPage.document_id, DocumentPage.page_num).in_(significant_keys)
+                )
+            if legacy_ids:
+                conditions.append(
+                    DocumentPage.document_id.in_(legacy_ids)
+                    & DocumentPage.legally_significant.is_(True)
+                )
 
-            output.append(
-                f"DOCUMENT: {doc.filename} (ID: {doc.id})\n"
-                f"Overall Summary: {doc.summary}\n\n"
-                f"ALL PAGES:\n{pages_summary}\n\n"
-                f"LEGALLY SIGNIFICANT PAGES (FULL TEXT):\n{significant_section}"
+            significant_texts = {}
+            if conditions:
+                result = await db.execute(
+                    select(DocumentPage.document_id, DocumentPage.page_num, DocumentPage.text)
+                    .where(or_(*conditions))
+                    .order_by(DocumentPage.document_id, DocumentPage.page_num)
+                )
+                significant_texts = {
+                    doc_id: list(rows)
+                    for doc_id, rows in groupby(result.all(), key=itemgetter(0))
+                }
+
+        parts = ["\n\n", "=" * 80]
+        for i, doc in enumerate(documents):
+            if i:
+                parts.append("\n\n")
+            _render_document(
+                parts,
+                doc,
+                page_summaries.get(doc.id, []),
+                significant_texts.get(doc.id, [])
             )
 
-        return "\n\n" + "="*80 + "\n\n".join(output)
+        rendered = "".join(parts)
+
+        documents_outputs[cache_key] = (token, rendered)
+        if len(documents_outputs) > DOCUMENTS_OUTPUT_CACHE_SIZE:
+            documents_outputs.popitem(last=False)
+
+        return rendered
 
     @tool
     async def get_page_text(doc_id: str, page_nums: List[int]) -> str:
@@ -134,24 +279,32 @@ def create_data_room_tools(session_id: str):
         """
         logger.info(f"[{session_id}] Getting page text: doc={doc_id}, pages={page_nums}")
 
+        # Fetch the filename and only the requested pages in one round-trip;
+        # a missing document yields no rows
         async with get_db() as db:
             result = await db.execute(
-                select(Document)
-                .options(selectinload(Document.pages))
+                select(Document.filename, DocumentPage.page_num, DocumentPage.text)
+                .outerjoin(
+                    DocumentPage,
+                    (DocumentPage.document_id == Document.id)
+                    & DocumentPage.page_num.in_(page_nums)
+                )
                 .where(Document.id == doc_id)
             )
-            doc = result.scalar_one_or_none()
+            rows = result.all()
 
-        if not doc:
+        if not rows:
             return f"Error: Document '{doc_id}' not found"
 
+        filename = rows[0].filename
+        page_texts = {row.page_num: row.text for row in rows}
+
         output = []
         for page_num in page_nums:
-            page = next((p for p in doc.pages if p.page_num == page_num), None)
-            if page:
+            if page_num in page_texts:
                 output.append(
-                    f"=== {doc.filename} - Page {page_num} ===\n"
-                    f"{page.text}"
+                    f"=== {filename} - Page {page_num} ===\n"
+                    f"{page_texts[page_num]}"
                 )
             else:
                 output.append(f"Page {page_num}: NOT FOUND")
@@ -176,22 +329,31 @@ def create_data_room_tools(session_id: str):
         """
         logger.info(f"[{session_id}] Getting page images: doc={doc_id}, pages={page_nums}")
 
+        # Check the document exists and fetch the requested pages' image paths
+        # in one round-trip; a missing document yields no rows, a document
+        # with none of the pages yields a single row with a NULL page_num
         async with get_db() as db:
             result = await db.execute(
-                select(Document)
-                .options(selectinload(Document.pages))
+                select(DocumentPage.page_num, DocumentPage.image_path)
+                .select_from(Document)
+                .outerjoin(
+                    DocumentPage,
+                    (DocumentPage.document_id == Document.id)
+                    & DocumentPage.page_num.in_(page_nums)
+                )
                 .where(Document.id == doc_id)
             )
-            doc = result.scalar_one_or_none()
+            rows = result.all()
 
-        if not doc:
+        if not rows:
             return f"Error: Document '{doc_id}' not found"
 
+        page_images = dict(rows)
+
         image_paths = []
         for page_num in page_nums:
-            page = next((p for p in doc.pages if p.page_num == page_num), None)
-            if page and page.image_path:
-                image_paths.append(f"Page {page_num}: {page.image_path}")
+            if page_images.get(page_num):
+                image_paths.append(f"Page {page_num}: {page_images[page_num]}")
             else:
                 image_paths.append(f"Page {page_num}: No image available")
 
@@ -7,54 +7,119 @@ Manages real-time connections between the backend and frontend for:
 - Workflow progress
 """
 from fastapi import WebSocket
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
+import asyncio
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of queued messages merged into a single WebSocket frame
+MAX_BATCH_SIZE = 32
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time agent communication."""
 
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.outbound_queues: Dict[str, asyncio.Queue] = {}
+        self.writer_tasks: Dict[str, asyncio.Task] = {}
 
     async def connect(self, session_id: str, websocket: WebSocket):
         """Accept and register a new WebSocket connection."""
         await websocket.accept()
+        self.disconnect(session_id)  # Replace any previous connection for this session
         self.active_connections[session_id] = websocket
+        self.outbound_queues[session_id] = asyncio.Queue()
+        self.writer_tasks[session_id] = asyncio.create_task(
+            self._writer(session_id, websocket, self.outbound_queues[session_id])
+        )
         logger.info(f"WebSocket connected: {session_id}")
 
     def disconnect(self, session_id: str):
         """Remove a WebSocket connection."""
         if session_id in self.active_connections:
             del self.active_connections[session_id]
+            self.outbound_queues.pop(session_id, None)
+            writer = self.writer_tasks.pop(session_id, None)
+            if writer and writer is not asyncio.current_task():
+                writer.cancel()
             logger.info(f"WebSocket disconnected: {session_id}")
 
+    async def _writer(self, session_id: str, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        Drain a session's outbound queue into the WebSocket.
+
+        Messages queued while a send is in flight are coalesced into one
+        frame containing a JSON array of messages. Messages are queued
+        already serialized, so only transport errors end the session.
+        """
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty() and len(batch) < MAX_BATCH_SIZE:
+                batch.append(queue.get_nowait())
+
+            frame = b"[" + b",".join(batch) + b"]"
+            try:
+                await websocket.send_text(frame.decode())
+                logger.debug(f"Sent {len(batch)} message(s) to {session_id}")
+            except Exception as e:
+                logger.error(f"Failed to send message to {session_id}: {e}")
+                self.disconnect(session_id)
+                return
+
     async def disconnect_all(self):
-        """Disconnect all active connections."""
-        for session_id in list(self.active_connections.keys()):
-            ws = self.active_connections[session_id]
-            await ws.close()
+        """Disconnect all active connections, closing them concurrently."""
+        connections = list(self.active_connections.items())
+
+        results = await asyncio.gather(
+            *(ws.close() for _, ws in connections),
+            return_exceptions=True
+        )
+
+        for (session_id, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to close WebSocket {session_id}: {result}")
             self.disconnect(session_id)
 
     async def send_message(self, session_id: str, message: Dict[str, Any]):
         """
-        Send a message to a specific session.
+        Queue a message for a specific session.
+
+        The message is serialized here, so an unserializable payload raises
+        to the caller instead of reaching the connection. The session's
+        writer task delivers it, batched with any other pending messages.
 
         Args:
             session_id: Session to send to
             message: Message data (will be JSON serialized)
         """
-        if session_id in self.active_connections:
-            ws = self.active_connections[session_id]
-            try:
-                await ws.send_json(message)
-                logger.debug(f"Sent message to {session_id}: {message.get('type')}")
-            except Exception as e:
-                logger.error(f"Failed to send message to {session_id}: {e}")
-                self.disconnect(session_id)
+        queue = self.outbound_queues.get(session_id)
+        if queue is not None:
+            queue.put_nowait(orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS))
+
+    async def broadcast(self, message: Dict[str, Any], session_ids: Optional[Iterable[str]] = None):
+        """
+        Queue a message for many sessions.
+
+        The payload is serialized once and queued for each target's writer,
+        so it is ordered with the session's other messages and never sent
+        concurrently with them.
+
+        Args:
+            message: Message data (will be JSON serialized)
+            session_ids: Sessions to send to (defaults to all connected sessions)
+        """
+        if session_ids is None:
+            session_ids = list(self.outbound_queues)
+
+        payload = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+
+        for session_id in session_ids:
+            queue = self.outbound_queues.get(session_id)
+            if queue is not None:
+                queue.put_nowait(payload)
 
     async def send_approval_request(self, session_id: str, approval_context: Any):
         """
@@ -66,7 +131,7 @@ class ConnectionManager:
         """
         message = {
             "type": "approval_request",
-            "data": approval_context.to_dict()
+            "data": orjson.Fragment(approval_context.to_json_bytes())  # Already serialized
         }
         await self.send_message(session_id, message)
 
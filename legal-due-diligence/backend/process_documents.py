@@ -6,18 +6,31 @@ Process PDF documents from a folder and add them to the data room.
 
 Usage:
     python process_documents.py /path/to/pdf/folder
+    python process_documents.py --worker  # help drain a queued folder
 """
 import sys
 import os
 import asyncio
 import logging
+import multiprocessing
+import re
+from datetime import datetime, timedelta
+from itertools import islice
+from multiprocessing.synchronize import Event as EventType
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 # Add app directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
+from app.config import settings
 from app.database import init_db, AsyncSessionLocal
-from app.services.document_service import DocumentService
+from app.models import PendingDocument, PendingDocumentStatus
+from app.services.document_service import DocumentService, close_anthropic_client
+from app.services.pdf_processor import configure_render_pool, shutdown_render_pool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,11 +38,224 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Files inserted into the queue per round-trip while listing a folder
+ENQUEUE_BATCH_SIZE = 100
+
+# Seconds an idle worker waits before re-polling a queue still being filled
+QUEUE_POLL_INTERVAL = 1.0
+
+
+def _lease_cutoff() -> datetime:
+    """Claims older than this belong to a worker presumed dead."""
+    return datetime.utcnow() - timedelta(seconds=settings.INGEST_LEASE_TIMEOUT)
+
+
+async def enqueue_documents(pdf_files: List[Path]):
+    """
+    Add PDFs to the pending_documents queue.
+
+    Re-enqueuing a path that previously failed, or whose worker's lease
+    has expired, puts it back in the queue; paths a worker is currently
+    processing are left alone.
+
+    Args:
+        pdf_files: PDF files to queue
+    """
+    stmt = pg_insert(PendingDocument).values([
+        {"file_path": str(pdf_path), "status": PendingDocumentStatus.PENDING}
+        for pdf_path in pdf_files
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PendingDocument.file_path],
+        set_={"status": PendingDocumentStatus.PENDING, "error_message": None},
+        where=(PendingDocument.status != PendingDocumentStatus.PROCESSING)
+        | (PendingDocument.claimed_at < _lease_cutoff())
+    )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def claim_pending_document() -> Optional[Tuple[int, str, datetime]]:
+    """
+    Claim the oldest unclaimed queued PDF.
+
+    SKIP LOCKED lets any number of workers, in any number of processes,
+    poll the queue at once without blocking on or double-claiming a row.
+    Rows whose lease hasn't been renewed for INGEST_LEASE_TIMEOUT are
+    claimable again, so a crashed or killed worker doesn't strand its
+    document.
+
+    Returns:
+        (job_id, file_path, claimed_at), or None when the queue is empty;
+        claimed_at identifies this claim until the lease is renewed
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(PendingDocument.id, PendingDocument.file_path)
+            .where(
+                (PendingDocument.status == PendingDocumentStatus.PENDING)
+                | (
+                    (PendingDocument.status == PendingDocumentStatus.PROCESSING)
+                    & (PendingDocument.claimed_at < _lease_cutoff())
+                )
+            )
+            .order_by(PendingDocument.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.one_or_none()
+        if job is None:
+            return None
+
+        claimed_at = datetime.utcnow()
+        await db.execute(
+            update(PendingDocument)
+            .where(PendingDocument.id == job.id)
+            .values(status=PendingDocumentStatus.PROCESSING, claimed_at=claimed_at)
+        )
+        await db.commit()
+        return job.id, job.file_path, claimed_at
+
+
+class JobLease:
+    """
+    Keeps a claimed job's lease alive while its document is processed.
+
+    claimed_at doubles as the claim's identity: the heartbeat and the final
+    update only touch the row while it still carries this worker's last
+    claimed_at, so a job reclaimed by another worker is left alone.
+    """
+
+    def __init__(self, job_id: int, claimed_at: datetime):
+        self.job_id = job_id
+        self.claimed_at = claimed_at
+
+    def _owned(self):
+        return (PendingDocument.id == self.job_id) & (PendingDocument.claimed_at == self.claimed_at)
+
+    async def heartbeat(self):
+        """Renew the lease every third of INGEST_LEASE_TIMEOUT until cancelled."""
+        while True:
+            await asyncio.sleep(settings.INGEST_LEASE_TIMEOUT / 3)
+
+            renewed_at = datetime.utcnow()
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(PendingDocument)
+                        .where(self._owned())
+                        .values(claimed_at=renewed_at)
+                    )
+                    await db.commit()
+            except Exception as e:
+                # Try again next beat; the lease has two more beats to go
+                logger.warning(f"Failed to renew the lease on job {self.job_id}: {e}")
+                continue
+
+            if result.rowcount == 0:
+                logger.warning(f"Lost the lease on job {self.job_id}")
+                return
+            self.claimed_at = renewed_at
+
+    async def finish(self, error: Optional[str] = None):
+        """Remove the job from the queue, or mark it failed with error."""
+        if error is None:
+            stmt = delete(PendingDocument).where(self._owned())
+        else:
+            stmt = (
+                update(PendingDocument)
+                .where(self._owned())
+                .values(status=PendingDocumentStatus.FAILED, error_message=error)
+            )
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+
+async def run_worker(enqueue_done: Optional[EventType] = None):
+    """
+    Process queued PDFs until the queue is empty.
+
+    Runs DOCUMENT_PROCESSING_CONCURRENCY claim loops in this process, each
+    with its own DB session per document. Finished jobs are removed from
+    the queue; failed ones are kept with their error.
+
+    Args:
+        enqueue_done: Set once the producer has queued every file; until
+            then an empty queue is polled rather than treated as finished
+    """
+    doc_service = DocumentService(use_batch_api=settings.USE_BATCH_API)
+
+    async def drain():
+        while True:
+            # Read the flag before claiming so a batch queued in between is seen
+            finished = enqueue_done is None or enqueue_done.is_set()
+            job = await claim_pending_document()
+            if job is None:
+                if finished:
+                    return
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            job_id, file_path, claimed_at = job
+            filename = Path(file_path).name
+            logger.info(f"Processing: {filename}")
+
+            lease = JobLease(job_id, claimed_at)
+            heartbeat = asyncio.create_task(lease.heartbeat())
+            try:
+                async with AsyncSessionLocal() as db:
+                    document = await doc_service.process_document(
+                        file_path=file_path,
+                        filename=filename,
+                        db_session=db
+                    )
+            except Exception as e:
+                logger.error(f"✗ Failed to process {filename}: {e}", exc_info=True)
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+                await lease.finish(str(e))
+                continue
+
+            # Stop renewing before the final update so the two can't race
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            await lease.finish()
+
+            logger.info(
+                f"✓ Successfully processed: {filename}\n"
+                f"  Document ID: {document.id}\n"
+                f"  Pages: {document.page_count}\n"
+                f"  Summary: {document.summary[:100]}..."
+            )
+
+    try:
+        await asyncio.gather(*(
+            drain() for _ in range(settings.DOCUMENT_PROCESSING_CONCURRENCY)
+        ))
+    finally:
+        await close_anthropic_client()
+        shutdown_render_pool()
+
+
+def _worker_main(enqueue_done: EventType):
+    """Entry point for a spawned ingest worker process."""
+    # Sibling workers share this machine's cores for rendering
+    configure_render_pool((os.cpu_count() or 1) // settings.INGEST_WORKER_PROCESSES)
+    asyncio.run(run_worker(enqueue_done))
+
 
 async def process_folder(folder_path: str):
     """
     Process all PDF files in a folder.
 
+    The PDFs are queued in pending_documents and drained by
+    INGEST_WORKER_PROCESSES worker processes. Further workers can join
+    from other machines with `python process_documents.py --worker`.
+
     Args:
         folder_path: Path to folder containing PDF files
     """
@@ -39,57 +265,72 @@ async def process_folder(folder_path: str):
         logger.error(f"Invalid folder path: {folder_path}")
         return
 
-    # Get all PDF files
-    pdf_files = list(folder.glob("*.pdf"))
-
-    if not pdf_files:
-        logger.warning(f"No PDF files found in {folder_path}")
-        return
-
-    logger.info(f"Found {len(pdf_files)} PDF files to process")
-
     # Initialize database
     await init_db()
 
-    # Create document service
-    doc_service = DocumentService()
-
-    # Process each document
-    processed_count = 0
-    failed_count = 0
-
-    for pdf_path in pdf_files:
-        filename = pdf_path.name
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Processing: {filename}")
-        logger.info(f"{'='*60}")
-
-        try:
-            async with AsyncSessionLocal() as db:
-                document = await doc_service.process_document(
-                    file_path=str(pdf_path),
-                    filename=filename,
-                    db_session=db
-                )
-
-            logger.info(f"✓ Successfully processed: {filename}")
-            logger.info(f"  Document ID: {document.id}")
-            logger.info(f"  Pages: {document.page_count}")
-            logger.info(f"  Summary: {document.summary[:100]}...")
-
-            processed_count += 1
+    # Spawn rather than fork: each worker builds its own engine and render pool
+    context = multiprocessing.get_context("spawn")
+    enqueue_done = context.Event()
+    workers = [
+        context.Process(target=_worker_main, args=(enqueue_done,), name=f"ingest-worker-{i}")
+        for i in range(settings.INGEST_WORKER_PROCESSES)
+    ]
+
+    # Stream the folder listing into the queue in batches, starting the
+    # workers after the first batch so processing overlaps the listing
+    queued_count = 0
+    pdf_paths = (pdf_path.resolve() for pdf_path in folder.glob("*.pdf"))
+    try:
+        while batch := list(islice(pdf_paths, ENQUEUE_BATCH_SIZE)):
+            await enqueue_documents(batch)
+            queued_count += len(batch)
+
+            if queued_count == len(batch):
+                logger.info(f"Starting {len(workers)} ingest workers")
+                for worker in workers:
+                    worker.start()
+    finally:
+        enqueue_done.set()
+
+    if not queued_count:
+        logger.warning(f"No PDF files found in {folder_path}")
+        return
 
-        except Exception as e:
-            logger.error(f"✗ Failed to process {filename}: {e}", exc_info=True)
-            failed_count += 1
+    logger.info(f"Queued {queued_count} PDF files to process")
+    await asyncio.gather(*(asyncio.to_thread(worker.join) for worker in workers))
+
+    for worker in workers:
+        if worker.exitcode:
+            logger.error(f"{worker.name} exited with code {worker.exitcode}")
+
+    # Finished files leave the queue; what remains either failed or was
+    # interrupted by a worker dying mid-document. Match on the folder
+    # rather than listing every path, which for a large folder would
+    # exceed the driver's bind-parameter limit
+    folder_pattern = f"^{re.escape(str(folder.resolve()) + os.sep)}[^{re.escape(os.sep)}]*$"
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(PendingDocument.status, func.count(PendingDocument.id))
+            .where(PendingDocument.file_path.regexp_match(folder_pattern))
+            .group_by(PendingDocument.status)
+        )
+        remaining = dict(result.all())
+
+    failed_count = remaining.get(PendingDocumentStatus.FAILED, 0)
+    interrupted_count = sum(remaining.values()) - failed_count
 
     # Summary
     logger.info(f"\n{'='*60}")
     logger.info("Processing Complete")
     logger.info(f"{'='*60}")
-    logger.info(f"Total files: {len(pdf_files)}")
-    logger.info(f"Successfully processed: {processed_count}")
+    logger.info(f"Total files: {queued_count}")
+    logger.info(f"Successfully processed: {queued_count - failed_count - interrupted_count}")
     logger.info(f"Failed: {failed_count}")
+    if interrupted_count:
+        logger.warning(
+            f"Interrupted: {interrupted_count} (requeued by the next run once "
+            f"their {settings.INGEST_LEASE_TIMEOUT}s lease expires)"
+        )
 
 
 async def process_single_document(pdf_path: str):
@@ -115,7 +356,7 @@ async def process_single_document(pdf_path: str):
     await init_db()
 
     # Create document service
-    doc_service = DocumentService()
+    doc_service = DocumentService(use_batch_api=settings.USE_BATCH_API)
 
     try:
         async with AsyncSessionLocal() as db:
@@ -129,7 +370,7 @@ async def process_single_document(pdf_path: str):
         logger.info(f"  Document ID: {document.id}")
         logger.info(f"  Pages: {document.page_count}")
         logger.info(f"  Summary: {document.summary}")
-        logger.info(f"  Legally significant pages: {[p.page_num for p in document.pages if p.legally_significant]}")
+        logger.info(f"  Legally significant pages: {document.significant_page_nums}")
 
     except Exception as e:
         logger.error(f"✗ Failed to process {pdf_file.name}: {e}", exc_info=True)
@@ -138,15 +379,19 @@ async def process_single_document(pdf_path: str):
 async def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: python process_documents.py <folder_or_file_path>")
+        print("Usage: python process_documents.py <folder_or_file_path | --worker>")
         print("\nExamples:")
         print("  python process_documents.py /path/to/pdf/folder")
         print("  python process_documents.py /path/to/document.pdf")
+        print("  python process_documents.py --worker")
         sys.exit(1)
 
     path = sys.argv[1]
 
-    if os.path.isdir(path):
+    if path == "--worker":
+        await init_db()
+        await run_worker()
+    elif os.path.isdir(path):
         await process_folder(path)
     elif os.path.isfile(path):
         await process_single_document(path)
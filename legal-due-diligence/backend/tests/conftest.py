@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Settings require an API key at import; tests never call the API
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+
+# Make the app package importable when running pytest from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -0,0 +1,40 @@
+"""Tests for parsing Claude's document analysis replies."""
+from app.services.document_service import parse_significant_pages
+
+
+def test_parses_comma_separated_pages():
+    assert parse_significant_pages("1,3,5,7", 10) == [1, 3, 5, 7]
+
+
+def test_ignores_prose_after_the_list():
+    reply = (
+        "2, 5, 9\n\n"
+        "These pages cover the 30-day notice in Section 7.1 … see page 11"
+    )
+    assert parse_significant_pages(reply, 40) == [2, 5, 9]
+
+
+def test_stops_at_first_item_that_is_not_a_page():
+    assert parse_significant_pages("1, 2 (indemnity), 4", 10) == [1]
+
+
+def test_expands_ranges():
+    assert parse_significant_pages("3-5, 8–9", 10) == [3, 4, 5, 8, 9]
+
+
+def test_accepts_page_prefix_and_conjunction():
+    assert parse_significant_pages("pages 1, 3, and 5", 10) == [1, 3, 5]
+    assert parse_significant_pages("1, 3 and 5", 10) == [1, 3, 5]
+
+
+def test_skips_leading_blank_lines_and_brackets():
+    assert parse_significant_pages("\n\n[2, 4]", 10) == [2, 4]
+
+
+def test_drops_pages_outside_the_document():
+    assert parse_significant_pages("0, 2, 8-12", 10) == [2, 8, 9, 10]
+
+
+def test_no_pages():
+    assert parse_significant_pages("", 10) == []
+    assert parse_significant_pages("None", 10) == []
@@ -91,28 +91,33 @@ export const useAppStore = create<AppState>()(
       };
 
       ws.onmessage = (event) => {
-        const message = JSON.parse(event.data);
-        console.log('WebSocket message:', message);
+        // The backend batches queued messages into a single JSON array frame
+        const payload = JSON.parse(event.data);
+        const messages = Array.isArray(payload) ? payload : [payload];
 
-        switch (message.type) {
-          case 'approval_request':
-            handleApprovalRequest(message.data, set, get);
-            break;
+        for (const message of messages) {
+          console.log('WebSocket message:', message);
 
-          case 'agent_status':
-            handleAgentStatus(message.data, set);
-            break;
+          switch (message.type) {
+            case 'approval_request':
+              handleApprovalRequest(message.data, set, get);
+              break;
 
-          case 'todos_update':
-            handleTodosUpdate(message.data, set);
-            break;
+            case 'agent_status':
+              handleAgentStatus(message.data, set);
+              break;
 
-          case 'workflow_event':
-            handleWorkflowEvent(message.data, set, get);
-            break;
+            case 'todos_update':
+              handleTodosUpdate(message.data, set);
+              break;
 
-          default:
-            console.warn('Unknown message type:', message.type);
+            case 'workflow_event':
+              handleWorkflowEvent(message.data, set, get);
+              break;
+
+            default:
+              console.warn('Unknown message type:', message.type);
+          }
         }
       };
 
@@ -45,6 +45,7 @@ export interface DocumentHighlight {
   reason: string;
   legally_significant_pages: number[];
   all_pages_summary: Record<number, string>;
+  summaries_truncated?: boolean;
 }
 
 export interface PageHighlight {